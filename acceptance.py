@@ -0,0 +1,163 @@
+import os
+import re
+import shlex
+import subprocess
+import yaml
+from tools.file_tools import directory_index
+from tools.workspace import resolve
+
+# checks by name, each takes the check's arguments and returns (passed, detail)
+CHECKS = {}
+
+# the answer has to start with its verdict, after markdown and quotes
+VERDICT_PATTERN = re.compile(r"""^[\s*_`'"#>:.-]*(true|false|yes|no)\b""")
+VERDICTS = {"true": True, "yes": True, "false": False, "no": False}
+
+
+def acceptance_check(name):
+    """Registers a function as a check usable from a .checks.yaml file."""
+
+    def register(func):
+        CHECKS[name] = func
+        return func
+
+    return register
+
+
+def _paths(value):
+    return [value] if isinstance(value, str) else list(value)
+
+
+@acceptance_check("file_exists")
+def file_exists(path):
+    missing = [p for p in _paths(path) if not os.path.exists(resolve(p))]
+    if missing:
+        return False, f"missing {', '.join(missing)}"
+    return True, "exists"
+
+
+@acceptance_check("file_contains")
+def file_contains(path, text=(), regex=None):
+    try:
+        with open(resolve(path), "r") as f:
+            content = f.read()
+    except OSError as e:
+        return False, f"cannot read {path}: {e}"
+    missing = [t for t in _paths(text) if t not in content]
+    if regex and not re.search(regex, content, re.MULTILINE):
+        missing.append(f"/{regex}/")
+    if missing:
+        return False, f"{path} is missing {', '.join(missing)}"
+    return True, f"{path} has the expected content"
+
+
+@acceptance_check("lists_files")
+def lists_files(path, directory=".", ignore=()):
+    """Every file name in the directory appears as a markdown list item in the file."""
+    try:
+        with open(resolve(path), "r") as f:
+            listed = {m.strip() for m in re.findall(r"^\s*[-*]\s+(.+)$", f.read(), re.MULTILINE)}
+    except OSError as e:
+        return False, f"cannot read {path}: {e}"
+    names = [
+        name
+        for name, is_dir in directory_index.walk(resolve(directory), max_depth=1, ignore=_paths(ignore))
+        if not is_dir
+    ]
+    missing = [name for name in names if name not in listed and f"`{name}`" not in listed]
+    if missing:
+        return False, f"{path} does not list {', '.join(missing[:10])}"
+    return True, f"{path} lists all {len(names)} files"
+
+
+@acceptance_check("command")
+def command(run, timeout=300):
+    """The command exits with status 0, e.g. a test suite."""
+    try:
+        result = subprocess.run(
+            shlex.split(run),
+            cwd=resolve("."),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return False, f"'{run}' failed: {e}"
+    if result.returncode != 0:
+        tail = result.stdout.strip().splitlines()[-3:]
+        return False, f"'{run}' exited with {result.returncode}: {' | '.join(tail)}"
+    return True, f"'{run}' passed"
+
+
+class AcceptanceChecks:
+    """Programmatic completion checks declared next to the objective.
+
+    For `context.md` the checks live in `context.checks.yaml`, a list where
+    each item names a registered check and its arguments:
+
+        checks:
+          - file_exists: README.md
+          - file_contains: {path: README.md, text: "# FILES"}
+          - lists_files: {path: README.md, ignore: [".*"]}
+          - command: {run: "python -m pytest -q"}
+
+    When every check passes the objective is met and no LLM review is needed.
+    The checks are the definition of done: while one fails the crew plans
+    again and the LLM review is skipped, it cannot overrule a failing check.
+    """
+
+    def __init__(self, checks=()):
+        self.checks = list(checks)
+
+    @classmethod
+    def for_context(cls, context_path):
+        """Loads the checks declared for a context file, none if there is no checks file."""
+        path = f"{os.path.splitext(context_path)[0]}.checks.yaml"
+        try:
+            with open(path, "r") as f:
+                data = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            return cls()
+        return cls(data.get("checks", []) if isinstance(data, dict) else data)
+
+    def __bool__(self):
+        return bool(self.checks)
+
+    def run(self):
+        """Runs every check, returns (all passed, [(name, passed, detail)])."""
+        results = []
+        for check in self.checks:
+            # a bare name is a check without arguments
+            name, arguments = next(iter(check.items())) if isinstance(check, dict) else (check, {})
+            func = CHECKS.get(name)
+            if func is None:
+                results.append((name, False, f"unknown check, expected one of {', '.join(CHECKS)}"))
+                continue
+            try:
+                if isinstance(arguments, dict):
+                    passed, detail = func(**arguments)
+                else:
+                    passed, detail = func(arguments)
+            except Exception as e:
+                passed, detail = False, f"error: {e}"
+            results.append((name, passed, detail))
+        return all(passed for _, passed, _ in results), results
+
+
+def parse_verdict(text):
+    """Reads a yes/no verdict from an LLM answer, None if it gives neither.
+
+    Only a leading true, false, yes or no counts, e.g. 'True.' or '**No**,
+    the file is missing'. Prose that mentions a verdict later on, such as
+    'Review complete: false', is ambiguous and returns None.
+    """
+    if text is None:
+        return None
+    text = str(text)
+    if "Final Answer:" in text:
+        text = text.rsplit("Final Answer:", 1)[1]
+    match = VERDICT_PATTERN.match(text.lower())
+    if match is None:
+        return None
+    return VERDICTS[match.group(1)]
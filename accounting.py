@@ -0,0 +1,282 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+
+ROLE_PATTERN = re.compile(r"You are (.+?)\.\n")
+TASK_PATTERN = re.compile(r"Current Task: (.+)")
+TOOL_ERROR_PREFIXES = ("Error", "Validation Error")
+
+usage_tracker_var = ContextVar("usage_tracker", default=None)
+register_configure_hook(usage_tracker_var, True)
+
+current_scope = ContextVar("usage_scope", default={})
+
+# the LLM call running in this context, its HTTP attempts are counted against it
+current_llm_run = ContextVar("current_llm_run", default=None)
+
+
+@contextmanager
+def usage_scope(**attributes):
+    """Attributes LLM and tool calls made inside the block (e.g. iteration=3)."""
+    token = current_scope.set({**current_scope.get(), **attributes})
+    try:
+        yield
+    finally:
+        current_scope.reset(token)
+
+
+class UsageTracker(BaseCallbackHandler):
+    """Records tokens, latency and retries for every LLM and tool call.
+
+    Calls are attributed to the agent role and task, taken from a `role:<name>`
+    tag on the LLM when present and otherwise from the crewAI prompt, and to the
+    loop iteration set with `usage_scope`. Tool calls inherit the attribution of
+    the agent run they belong to.
+    """
+
+    def __init__(self):
+        self.records = []
+        self._listeners = []
+        self._pending = {}
+        self._run_attribution = {}
+        self._parents = {}
+        self._lock = threading.Lock()
+        self._encoding = None
+        self._last_prompt = ""
+
+    def install(self):
+        """Attaches the tracker to every callback manager in this context."""
+        usage_tracker_var.set(self)
+        return self
+
+    def _count_tokens(self, text):
+        if self._encoding is None:
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                self._encoding = False
+        if self._encoding is False:
+            return len(text) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def _attribute(self, text, tags, parent_run_id):
+        attribution = dict(self._run_attribution.get(parent_run_id, {}))
+        for tag in tags or ():
+            if tag.startswith("role:"):
+                attribution["role"] = tag[5:]
+        if "role" not in attribution:
+            match = ROLE_PATTERN.search(text)
+            if match:
+                attribution["role"] = match.group(1)
+        if "task" not in attribution:
+            match = TASK_PATTERN.search(text)
+            if match:
+                attribution["task"] = match.group(1)[:120]
+        attribution.update(current_scope.get())
+        # share the attribution with the enclosing runs, so tools called by the
+        # same agent executor are attributed to the same role and task
+        run_id = parent_run_id
+        while run_id is not None:
+            self._run_attribution[run_id] = attribution
+            run_id = self._parents.get(run_id)
+        return attribution
+
+    def _cached_estimate(self, text):
+        """Tokens of the prompt shared with the previous one, what a single-slot KV cache can reuse."""
+        shared = len(os.path.commonprefix([self._last_prompt, text]))
+        self._last_prompt = text
+        return self._count_tokens(text[:shared]) if shared else 0
+
+    def _start(self, kind, run_id, parent_run_id, name, text, tags):
+        with self._lock:
+            self._pending[run_id] = {
+                "kind": kind,
+                "name": name,
+                **self._attribute(text, tags, parent_run_id),
+                "prompt_tokens": self._count_tokens(text) if kind == "llm" else None,
+                "cached_tokens": self._cached_estimate(text) if kind == "llm" else None,
+                "cache_source": "estimate" if kind == "llm" else None,
+                "completion_tokens": None,
+                "ttft": None,
+                "latency": None,
+                "retries": 0,
+                "error": None,
+                "started": time.time(),
+                "_start": time.perf_counter(),
+                "_attempts": 0,
+            }
+
+    def _finish(self, run_id, **fields):
+        with self._lock:
+            record = self._pending.pop(run_id, None)
+            if record is None:
+                return
+            record["latency"] = time.perf_counter() - record.pop("_start")
+            # the openai client retries inside one call, every attempt after the first is a retry
+            record["retries"] = max(record.pop("_attempts") - 1, 0)
+            record.update(fields)
+            self.records.append(record)
+            for listener in self._listeners:
+                listener(record)
+
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, **kwargs):
+        with self._lock:
+            self._parents[run_id] = parent_run_id
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        with self._lock:
+            self._parents.pop(run_id, None)
+            self._run_attribution.pop(run_id, None)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self.on_chain_end(None, run_id=run_id)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        text = "\n".join(str(message.content) for batch in messages for message in batch)
+        self._start("llm", run_id, parent_run_id, _name(serialized), text, tags)
+        current_llm_run.set(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        self._start("llm", run_id, parent_run_id, _name(serialized), "\n".join(prompts), tags)
+        current_llm_run.set(run_id)
+
+    def on_llm_new_token(self, token, *, run_id, **kwargs):
+        with self._lock:
+            record = self._pending.get(run_id)
+            if record is not None and record["ttft"] is None:
+                record["ttft"] = time.perf_counter() - record["_start"]
+
+    def on_http_request(self):
+        """Counts an HTTP attempt of the LLM call running in this context, called by the shared client."""
+        with self._lock:
+            record = self._pending.get(current_llm_run.get())
+            if record is not None:
+                record["_attempts"] += 1
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        fields = {}
+        if usage.get("prompt_tokens") is not None:
+            fields["prompt_tokens"] = usage["prompt_tokens"]
+        # backends that report prompt caching replace the estimate
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens")
+        if cached is not None:
+            fields["cached_tokens"] = cached
+            fields["cache_source"] = "backend"
+        if usage.get("completion_tokens") is not None:
+            fields["completion_tokens"] = usage["completion_tokens"]
+        else:
+            text = "".join(
+                generation.text for batch in response.generations for generation in batch
+            )
+            fields["completion_tokens"] = self._count_tokens(text)
+        self._finish(run_id, **fields)
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=repr(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, tags=None, **kwargs):
+        self._start("tool", run_id, parent_run_id, _name(serialized), "", tags)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        output = str(output)
+        self._finish(
+            run_id,
+            completion_tokens=self._count_tokens(output),
+            # tools report most failures in their output instead of raising
+            returned_error=output.startswith(TOOL_ERROR_PREFIXES),
+        )
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._finish(run_id, error=repr(error))
+
+    def subscribe(self, listener):
+        """Calls listener(record) for every finished call, the ones recorded so far first."""
+        with self._lock:
+            for record in self.records:
+                listener(record)
+            self._listeners.append(listener)
+
+    def snapshot(self):
+        """Returns a copy of the records of the finished calls."""
+        with self._lock:
+            return list(self.records)
+
+    def in_flight(self):
+        """Returns the calls started but not finished, with their age in seconds."""
+        now = time.time()
+        with self._lock:
+            return [
+                {
+                    "kind": record["kind"],
+                    "name": record["name"],
+                    "role": record.get("role", "?"),
+                    "age": now - record["started"],
+                }
+                for record in self._pending.values()
+            ]
+
+    def summary(self):
+        """Aggregates the records per role and kind."""
+        totals = defaultdict(
+            lambda: {
+                "calls": 0,
+                "prompt_tokens": 0,
+                "cached_tokens": 0,
+                "completion_tokens": 0,
+                "latency": 0.0,
+                "retries": 0,
+                "errors": 0,
+            }
+        )
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            row = totals[(record.get("role", "?"), record["kind"])]
+            row["calls"] += 1
+            row["prompt_tokens"] += record["prompt_tokens"] or 0
+            row["cached_tokens"] += record.get("cached_tokens") or 0
+            row["completion_tokens"] += record["completion_tokens"] or 0
+            row["latency"] += record["latency"] or 0.0
+            row["retries"] += record["retries"]
+            row["errors"] += 1 if record["error"] else 0
+        return dict(totals)
+
+    def print_summary(self):
+        """Prints an end-of-run table of usage per role."""
+        print("--------------------------------------------------")
+        print("Usage per role:")
+        print(
+            f"{'role':<20}{'kind':<6}{'calls':>7}{'prompt':>10}{'cached':>9}{'compl':>9}"
+            f"{'seconds':>10}{'retries':>9}{'errors':>8}"
+        )
+        for (role, kind), row in sorted(self.summary().items()):
+            print(
+                f"{role[:19]:<20}{kind:<6}{row['calls']:>7}{row['prompt_tokens']:>10}{row['cached_tokens']:>9}"
+                f"{row['completion_tokens']:>9}{row['latency']:>10.1f}{row['retries']:>9}{row['errors']:>8}"
+            )
+        print("--------------------------------------------------")
+
+    def dump_jsonl(self, path):
+        """Writes one JSON record per call, for comparing runs across models."""
+        with self._lock:
+            records = list(self.records)
+        with open(path, "w") as file:
+            for record in records:
+                file.write(json.dumps(record, default=str) + "\n")
+        return path
+
+
+def _name(serialized):
+    serialized = serialized or {}
+    return serialized.get("name") or (serialized.get("id") or ["?"])[-1]
@@ -0,0 +1,72 @@
+import functools
+import threading
+from collections import Counter
+
+
+class AgentRegistry:
+    """Per-run registry of agents keyed by role.
+
+    Factories decorated with `AgentRegistry.shared(key)` build their agent once
+    per run; every later call (e.g. from a task-creation tool) returns the same
+    instance, so the LLM client, tool wrappers, executor and memory are shared.
+    """
+
+    _agents = {}
+    _built = Counter()
+    _reused = Counter()
+    _lock = threading.RLock()
+
+    @classmethod
+    def get(cls, key, factory):
+        """Returns the agent registered for the key, building it with the factory on first use."""
+        with cls._lock:
+            agent = cls._agents.get(key)
+            if agent is None:
+                agent = factory()
+                cls._agents[key] = agent
+                cls._built[key] += 1
+            else:
+                cls._reused[key] += 1
+            return agent
+
+    @classmethod
+    def shared(cls, key):
+        """Decorator that resolves an agent factory through the registry."""
+
+        def decorator(factory):
+            @functools.wraps(factory)
+            def wrapper():
+                return cls.get(key, factory)
+
+            return wrapper
+
+        return decorator
+
+    @classmethod
+    def reset(cls):
+        """Forgets all agents and counters, call at the start of a new run."""
+        with cls._lock:
+            cls._agents.clear()
+            cls._built.clear()
+            cls._reused.clear()
+
+    @classmethod
+    def stats(cls):
+        """Returns constructions and avoided constructions per role."""
+        with cls._lock:
+            return {
+                key: {"built": cls._built[key], "reused": cls._reused[key]}
+                for key in sorted(set(cls._built) | set(cls._reused))
+            }
+
+    @classmethod
+    def print_stats(cls):
+        """Prints how many agent constructions were avoided during the run."""
+        stats = cls.stats()
+        print("--------------------------------------------------")
+        print("Agent Registry:")
+        for key, counts in stats.items():
+            print(f"- {key}: built {counts['built']}, reused {counts['reused']}")
+        avoided = sum(counts["reused"] for counts in stats.values())
+        print(f"Agent constructions avoided: {avoided}")
+        print("--------------------------------------------------")
@@ -1,7 +1,15 @@
 from textwrap import dedent
 from crewai import Agent, Task, Crew, Process
+from acceptance import AcceptanceChecks, parse_verdict
+from accounting import usage_scope
+from agent_registry import AgentRegistry
+from llm import agent_llm
+from prompt_layout import prompt_i18n, warmup
+from task_dedup import TaskIndex, dedup_role
+from task_store import TaskStore
 from tools.file_tools import FileTools
 from tools.task_tools import TaskManagerTools, TaskStatuses, CrewTaskTools
+from tools.toolset import toolset
 
 
 def append_result_to_context_md(result):
@@ -14,13 +22,16 @@ def append_result_to_context_md(result):
 class TaskExecutorCrew:
 
     @staticmethod
+    @AgentRegistry.shared("task_executor.planner")
     def planner_agent():
         return Agent(
             role="Planner",
+            llm=agent_llm("Planner"),
+            i18n=prompt_i18n(),
             goal="Read context and create a list of tasks to complete the objective(s).",
-            tools=[
+            tools=toolset(
                 TaskManagerTools.read_context,
-            ],
+            ),
             backstory=dedent(
                 """\
                   You are a top-notch planner with the ability to break down complex
@@ -33,15 +44,18 @@ class TaskExecutorCrew:
         )
 
     @staticmethod
+    @AgentRegistry.shared("task_executor.executor")
     def executor_agent():
         return Agent(
             role="Executor",
+            llm=agent_llm("Executor"),
+            i18n=prompt_i18n(),
             goal="Complete assigned tasks",
-            tools=[
+            tools=toolset(
                 FileTools.create_file,
-                FileTools.check_existence,
+                FileTools.check_if_file_exists,
                 FileTools.list_files,
-            ],
+            ),
             backstory=dedent(
                 """\
                   You are an executor with a knack for getting things done. Your job
@@ -53,6 +67,8 @@ class TaskExecutorCrew:
         )
 
     def run_crew(self):
+        # Start a fresh agent registry for this run
+        AgentRegistry.reset()
         # Initialize Agents
         planner = self.planner_agent()
         executor = self.executor_agent()
@@ -80,16 +96,19 @@ class TaskExecutorCrew:
 
 class TaskReviewerCrew:
     @staticmethod
+    @AgentRegistry.shared("task_reviewer.reviewer")
     def reviewer_agent():
         return Agent(
             role="Reviewer",
+            llm=agent_llm("Reviewer"),
+            i18n=prompt_i18n(),
             goal="Ensure tasks are completed satisfactorily and update the task list.",
-            tools=[
+            tools=toolset(
                 FileTools.read_file,
-                FileTools.check_existence,
+                FileTools.check_if_file_exists,
                 FileTools.list_files,
                 TaskManagerTools.read_context,
-            ],
+            ),
             backstory=dedent(
                 """\
                   You are a reviewer with an eye for detail. Your job is to verify the
@@ -102,6 +121,8 @@ class TaskReviewerCrew:
         )
 
     def run_crew(self):
+        # Start a fresh agent registry for this run
+        AgentRegistry.reset()
         # Initialize Agents
         reviewer = self.reviewer_agent()
 
@@ -128,22 +149,36 @@ class TaskReviewerCrew:
 
 class CoordinationCrew:
     dynamic_tasks = []
+    # every task queued during the run, run or not, to catch the planner repeating itself
+    task_index = TaskIndex()
 
     @classmethod
     def add_dynamic_task(cls, task):
+        """Queues a task for the next crew pass, returns (task_id, created)."""
+        role = task.agent.role if task.agent else None
+        task_id = TaskStore.task_id(role, task.description)
+        if dedup_role(role):
+            match = cls.task_index.match(task.description, scope=role)
+            if match is not None:
+                return match[0], False
+            cls.task_index.add(task_id, task.description, scope=role)
         cls.dynamic_tasks.append(task)
+        return task_id, True
 
     @staticmethod
+    @AgentRegistry.shared("coordination.planner")
     def planner_agent():
         return Agent(
             role="Planner",
+            llm=agent_llm("Planner"),
+            i18n=prompt_i18n(),
             goal="Read context and create a list of tasks for execution",
-            tools=[
+            tools=toolset(
                 TaskManagerTools.read_context,
                 CrewTaskTools.add_task_for_planner,
                 CrewTaskTools.add_task_for_executor,
                 CrewTaskTools.add_task_for_reviewer,
-            ],
+            ),
             backstory=dedent(
                 """\
                     As the Planner, your job is to use the available context create
@@ -156,18 +191,21 @@ class CoordinationCrew:
         )
 
     @staticmethod
+    @AgentRegistry.shared("coordination.executor")
     def executor_agent():
         return Agent(
             role="Executor",
+            llm=agent_llm("Executor"),
+            i18n=prompt_i18n(),
             goal="Complete assigned tasks",
-            tools=[
+            tools=toolset(
                 FileTools.get_current_directory,
                 FileTools.change_directory,
                 FileTools.create_directory,
                 FileTools.create_file,
-                FileTools.check_existence,
+                FileTools.check_if_file_exists,
                 FileTools.list_files,
-            ],
+            ),
             backstory=dedent(
                 """\
                     As the Executor, you are responsible for carrying out the tasks 
@@ -180,19 +218,22 @@ class CoordinationCrew:
         )
 
     @staticmethod
+    @AgentRegistry.shared("coordination.reviewer")
     def reviewer_agent():
         return Agent(
             role="Reviewer",
+            llm=agent_llm("Reviewer"),
+            i18n=prompt_i18n(),
             goal="Ensure tasks are completed satisfactorily and update the task list",
-            tools=[
+            tools=toolset(
                 FileTools.get_current_directory,
                 FileTools.change_directory,
                 FileTools.read_file,
-                FileTools.check_existence,
+                FileTools.check_if_file_exists,
                 FileTools.list_files,
                 CrewTaskTools.add_task_for_planner,
                 TaskStatuses.get_valid_statuses,
-            ],
+            ),
             backstory=dedent(
                 """\
                   As the Reviewer, your role is to verify the completion and quality
@@ -204,7 +245,21 @@ class CoordinationCrew:
             verbose=True,
         )
 
+    @staticmethod
+    def checks_pass(checks):
+        """Runs the acceptance checks, noting failures in the context for the planner."""
+        passed, results = checks.run()
+        for name, ok, detail in results:
+            print(f"- {name}: {'pass' if ok else 'FAIL'} ({detail})")
+        if not passed:
+            failures = "\n".join(f"- {name}: {detail}" for name, ok, detail in results if not ok)
+            append_result_to_context_md(f"Acceptance checks failed:\n{failures}")
+        return passed
+
     def run_crew(self):
+        # Start a fresh agent registry and task index for this run
+        AgentRegistry.reset()
+        self.task_index.clear()
         # Initialize Agents
         planner = self.planner_agent()
         executor = self.executor_agent()
@@ -219,42 +274,63 @@ class CoordinationCrew:
         # Initialize tasks list with the initial task
         tasks = [initial_task]
 
+        # Programmatic checks declared next to the objective in context.checks.yaml
+        checks = AcceptanceChecks.for_context("context.md")
+        if checks and self.checks_pass(checks):
+            print("--Acceptance checks already pass, nothing to do--")
+            return
+
+        # evaluate the static prompt prefixes before the first crew pass
+        warmup([planner, executor, reviewer])
+
         # Loop until the project is complete
+        iteration = 0
         while True:
-            print("--Initializing Crew--")
-            # Include dynamically generated tasks into the tasks list
-            tasks.extend(self.dynamic_tasks)
-            self.dynamic_tasks.clear()  # Clear dynamic_tasks for the next iteration
-            # Initialize or update Crew with the current tasks
-            crew = Crew(
-                agents=[planner, executor, reviewer],
-                tasks=tasks,
-                process=Process.sequential,
-                verbose=True,
-            )
-
-            print("--Crew Initialized, Kicking off operation--")
-            # Execute the crew process
-            result = crew.kickoff()
-
-            print("--Crew Execution Completed, Updating Context--")
-            # Append the result to context.md
-            append_result_to_context_md(result)
-
-            # Define a review task to assess project completion
-            review_task = Task(
-                description="You are a computer program that can only return true or false. Review the updated context and determine if the project objectives have been met.",
-                agent=reviewer,
-            )
-            # Execute the review task
-            print("--Reviewing Outcome--")
-            review_result = review_task.execute()
-
-            if review_result.lower() == "true":
-                print("--Project is complete!--")
-                break  # Exit the loop if the project is complete
-
-            print("--Clearing tasks, starting over--")
-            tasks.clear()  # Clear the tasks list
-
-            # The Planner agent will generate new tasks based on the updated context at the start of the next loop iteration
+            iteration += 1
+            # attribute token and latency usage to this loop iteration
+            with usage_scope(iteration=iteration):
+                print("--Initializing Crew--")
+                # Include dynamically generated tasks into the tasks list
+                tasks.extend(self.dynamic_tasks)
+                self.dynamic_tasks.clear()  # Clear dynamic_tasks for the next iteration
+                # Initialize or update Crew with the current tasks
+                crew = Crew(
+                    agents=[planner, executor, reviewer],
+                    tasks=tasks,
+                    process=Process.sequential,
+                    verbose=True,
+                )
+
+                print("--Crew Initialized, Kicking off operation--")
+                # Execute the crew process
+                result = crew.kickoff()
+
+                print("--Crew Execution Completed, Updating Context--")
+                # Append the result to context.md
+                append_result_to_context_md(result)
+
+                # Run the cheap checks first, they decide without an LLM review,
+                # a failing check means another pass whatever a review would say
+                if checks:
+                    print("--Running Acceptance Checks--")
+                    if self.checks_pass(checks):
+                        print("--Project is complete!--")
+                        break
+                else:
+                    # Define a review task to assess project completion
+                    review_task = Task(
+                        description="You are a computer program that can only return true or false. Review the updated context and determine if the project objectives have been met.",
+                        agent=reviewer,
+                    )
+                    # Execute the review task
+                    print("--Reviewing Outcome--")
+                    review_result = review_task.execute()
+
+                    if parse_verdict(review_result):
+                        print("--Project is complete!--")
+                        break  # Exit the loop if the project is complete
+
+                print("--Clearing tasks, starting over--")
+                tasks.clear()  # Clear the tasks list
+
+                # The Planner agent will generate new tasks based on the updated context at the start of the next loop iteration
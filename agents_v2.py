@@ -1,56 +1,138 @@
+import os
 from crewai import Agent
+from langchain_core.messages import HumanMessage, SystemMessage
+from pydantic import BaseModel
+from typing import Optional
+from acceptance import parse_verdict
+from agent_registry import AgentRegistry
+from llm import agent_llm, build_llm
+from prompt_layout import prompt_i18n
+from task_store import TaskStore
 from textwrap import dedent
 from tools.file_tools import FileTools
-from tools.task_tools import TaskManagerTools, TaskRepositoryTools
+from tools.search_tools import SearchTools
+from tools.task_tools import TaskManagerTools, TaskRepositoryTools, TaskStatuses
+from tools.toolset import toolset
 
 
-# Shared resource class for tasks
+# how the decider's single-token answer is constrained: "grammar" for
+# text-generation-webui, "logit_bias" for OpenAI models, or "none"
+DECIDER_CONSTRAINT = os.environ.get("DECIDER_CONSTRAINT", "grammar")
+
+DECIDER_PROMPT = dedent(
+    """\
+    You are a specialized machine that can only output the words 'yes' or 'no'.
+    Review the given context and decide whether the objective has been met.
+    """
+)
+
+
+class Verdict(BaseModel):
+    decision: Optional[bool]
+    raw: str
+    constraint: str
+
+    def __bool__(self):
+        return bool(self.decision)
+
+
+# Shared resource class for tasks, backed by an indexed TaskStore
 class TaskRepository:
-    planner_tasks = []
-    executor_tasks = []
-    reviewer_tasks = []
+    store = TaskStore(
+        roles=("planner", "executor", "reviewer", "decider"),
+        archive_path=os.environ.get(
+            "TASK_ARCHIVE_PATH", "./.cache/task_archive.jsonl"
+        ),
+    )
+    planner_tasks = store.view("planner")
+    executor_tasks = store.view("executor")
+    reviewer_tasks = store.view("reviewer")
+    decider_tasks = store.view("decider")
 
     @classmethod
     def iterate_task_roles(cls):
         """Iterate over all task roles and their tasks."""
-        for attr in dir(cls):
-            if attr.endswith("_tasks"):
-                yield attr.replace("_tasks", ""), getattr(cls, attr)
+        for role in cls.store.roles():
+            yield role, cls.store.view(role)
 
     @classmethod
     def get_all_tasks(cls):
         """Retrieve all tasks across all roles."""
         all_tasks = []
-        for _, tasks in cls.iterate_task_roles():
-            all_tasks.extend(tasks)
+        for role in cls.store.roles():
+            all_tasks.extend(cls.store.snapshot(role))
         return all_tasks
 
     @classmethod
     def get_tasks_for_role(cls, role):
         """Retrieve tasks for the given role."""
-        return getattr(cls, f"{role}_tasks")
+        return cls.store.view(role)
+
+    @classmethod
+    def add_task(cls, role, task):
+        """Queue a task for the given role, returns (record, created)."""
+        return cls.store.add(role, task)
+
+    @classmethod
+    def start_run(cls):
+        """Forget the near-duplicate index of the previous run."""
+        cls.store.start_run()
+
+    @classmethod
+    def get_task(cls, task_id):
+        """Look up a pending or archived task by its id."""
+        return cls.store.get(task_id)
+
+    @classmethod
+    def start_tasks(cls, role, ids=None):
+        """Mark the queued tasks for the role (or only the given ids) active and return them for a crew."""
+        return cls.store.start(role, ids)
+
+    @classmethod
+    def complete_tasks(cls, role, result=None, ids=None):
+        """Archive the active tasks for the role (or only the given ids) once its crew has finished."""
+        return cls.store.complete(role, result, ids)
+
+    @classmethod
+    def subscribe(cls, listener):
+        """Call listener(record) whenever a task is queued for any role."""
+        cls.store.subscribe(listener)
+
+    @classmethod
+    def unsubscribe(cls, listener):
+        cls.store.unsubscribe(listener)
+
+    @classmethod
+    def clear_all_tasks(cls):
+        """Drop all pending tasks without archiving them."""
+        cls.store.discard()
 
 
 class PlanningCrew:
 
     @staticmethod
+    @AgentRegistry.shared("planner")
     def planner_agent():
         return Agent(
             role="Planner",
+            llm=agent_llm("Planner"),
+            i18n=prompt_i18n(),
             goal="Read context and create a list of tasks to complete the objective(s).",
             memory=True,
-            tools=[
+            tools=toolset(
                 TaskManagerTools.read_context,
                 TaskRepositoryTools.get_current_tasks,
                 TaskRepositoryTools.clear_all_tasks,
                 TaskRepositoryTools.add_task_for_executor,
                 TaskRepositoryTools.add_task_for_reviewer,
-            ],
+                TaskRepositoryTools.add_task_for_decider,
+            ),
             backstory=dedent(
                 """\
                     You are a top-notch planner with the ability to break down complex
                     objectives into smaller, actionable tasks. Your job is to read the
-                    context and create a list of tasks for execution.
+                    context and create a list of tasks for execution. Yes/no questions
+                    about the context go to the decider.
                 """
             ),
             allow_delegation=False,
@@ -61,19 +143,24 @@ class PlanningCrew:
 class ExecutionCrew:
 
     @staticmethod
+    @AgentRegistry.shared("executor")
     def executor_agent():
         return Agent(
             role="Executor",
+            llm=agent_llm("Executor"),
+            i18n=prompt_i18n(),
             goal="Complete assigned tasks",
             memory=True,
-            tools=[
+            tools=toolset(
                 FileTools.append_to_file,
+                FileTools.batch_file_operations,
                 FileTools.check_if_file_exists,
                 FileTools.create_file,
                 FileTools.list_files,
+                SearchTools.search_files,
                 TaskManagerTools.read_context,
                 TaskRepositoryTools.add_task_for_executor,
-            ],
+            ),
             backstory=dedent(
                 """\
                     You are an executor with a knack for getting things done. Your job
@@ -85,18 +172,22 @@ class ExecutionCrew:
         )
 
     @staticmethod
+    @AgentRegistry.shared("reviewer")
     def reviewer_agent():
         return Agent(
             role="Reviewer",
+            llm=agent_llm("Reviewer"),
+            i18n=prompt_i18n(),
             goal="Ensure tasks are completed satisfactorily.",
             memory=True,
-            tools=[
+            tools=toolset(
                 FileTools.check_if_file_exists,
                 FileTools.list_files,
                 FileTools.read_file,
+                SearchTools.search_files,
                 TaskManagerTools.read_context,
                 TaskRepositoryTools.add_task_for_planner,
-            ],
+            ),
             backstory=dedent(
                 """\
                     You are a reviewer with an eye for detail. Your job is to verify the
@@ -108,11 +199,14 @@ class ExecutionCrew:
             allow_delegation=False,
         )
 
-    # think this could be done better with tools/flags
+    # full agent kept for crews, decide() is the fast single-token path
     @staticmethod
+    @AgentRegistry.shared("decider")
     def decider_agent():
         return Agent(
             role="Decider",
+            llm=agent_llm("Decider"),
+            i18n=prompt_i18n(),
             goal="Respond only with yes or no given the provided context.",
             tools=[],
             backstory=dedent(
@@ -124,3 +218,51 @@ class ExecutionCrew:
             ),
             allow_delegation=False,
         )
+
+    @staticmethod
+    def _decider_llm():
+        """A chat model bound to a one or two token yes/no completion."""
+        llm = build_llm(role="Decider", temperature=0, max_tokens=2)
+        options = {"stop": ["\n", ".", ","]}
+        if DECIDER_CONSTRAINT == "grammar":
+            options["extra_body"] = {"grammar_string": 'root ::= "yes" | "no"'}
+        elif DECIDER_CONSTRAINT == "logit_bias":
+            try:
+                import tiktoken
+
+                try:
+                    encoding = tiktoken.encoding_for_model(llm.model_name)
+                except KeyError:
+                    encoding = tiktoken.get_encoding("cl100k_base")
+                allowed = {token for word in ("yes", "no", " yes", " no") for token in encoding.encode(word)}
+                options["logit_bias"] = {token: 100 for token in allowed}
+            except Exception:
+                # without the tokenizer the answer is still capped by max_tokens and stop
+                pass
+        return llm.bind(**options)
+
+    @staticmethod
+    def decide(question, context=None):
+        """Answers a yes/no question about the context with one constrained completion, no agent loop."""
+        if context is None:
+            path = TaskManagerTools.CONTEXT_FILE_PATH
+            context = TaskManagerTools.read_context.func() if os.path.exists(path) else ""
+        messages = [
+            SystemMessage(content=DECIDER_PROMPT),
+            HumanMessage(content=f"Context:\n{context}\n\nQuestion: {question}\nAnswer yes or no."),
+        ]
+        raw = ExecutionCrew._decider_llm().invoke(messages).content
+        return Verdict(decision=parse_verdict(raw), raw=raw, constraint=DECIDER_CONSTRAINT)
+
+    @staticmethod
+    def decide_tasks(ids=None):
+        """Answers the queued decider tasks (or only the given ids) with decide() and archives them, returns (description, Verdict) pairs."""
+        verdicts = []
+        for record in TaskRepository.store.by_status(TaskStatuses.TODO):
+            if record.role != "decider" or (ids is not None and record.id not in ids):
+                continue
+            TaskRepository.start_tasks("decider", [record.id])
+            verdict = ExecutionCrew.decide(record.description)
+            TaskRepository.complete_tasks("decider", verdict.raw, [record.id])
+            verdicts.append((record.description, verdict))
+        return verdicts
@@ -0,0 +1,435 @@
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_SERVER = os.path.join(REPO_ROOT, "benchmarks", "stub_server.py")
+
+
+def _react(action=None, action_input=None, answer=None):
+    if action:
+        return f"Thought: Do I need to use a tool? Yes\nAction: {action}\nAction Input: {action_input}"
+    return f"Thought: Do I need to use a tool? No\nFinal Answer: {answer}"
+
+
+def default_script(rounds=2):
+    """Responses that walk both crews through a short, complete run."""
+    return {
+        "rules": [
+            {
+                # CoordinationCrew review, false until the last round
+                "match": r"can only return true or false",
+                "times": rounds - 1,
+                "responses": [_react(answer="false")],
+            },
+            {
+                "match": r"can only return true or false",
+                "responses": [_react(answer="true")],
+            },
+            {
+                "match": r"Progressively summarize",
+                "responses": ["The agents read the context and created the files."],
+            },
+            {
+                "match": r"You are Planner\..*Current Task: Achieve the objective",
+                "responses": [
+                    _react("read_context", "context"),
+                    _react("add_task_for_executor", "Create the file hello.txt"),
+                    _react("add_task_for_executor", "Create the file world.txt"),
+                    _react("add_task_for_reviewer", "Check that hello.txt and world.txt exist"),
+                    _react(answer="Queued the executor and reviewer tasks."),
+                ],
+            },
+            {
+                "match": r"You are Executor\..*Current Task: Create the file hello.txt",
+                "responses": [
+                    _react("create_file", "hello.txt"),
+                    _react("list_files", "."),
+                    _react(answer="Created hello.txt."),
+                ],
+            },
+            {
+                "match": r"You are Executor\..*Current Task: Create the file world.txt",
+                "responses": [
+                    _react("create_file", "world.txt"),
+                    _react(answer="Created world.txt."),
+                ],
+            },
+            {
+                "match": r"You are Reviewer\..*Current Task: Check that hello.txt",
+                "responses": [
+                    _react("check_if_file_exists", "hello.txt"),
+                    _react("check_if_file_exists", "world.txt"),
+                    _react(answer="Both files exist."),
+                ],
+            },
+        ]
+    }
+
+
+class StubProcess:
+    """Runs the stub server in a child process so its CPU time is not counted."""
+
+    def __init__(self, script, latency, token_rate, prompt_rate=0.0):
+        self.script = script
+        self.latency = latency
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.process = None
+        self.port = None
+
+    def __enter__(self):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self._script_file = tempfile.NamedTemporaryFile("w", suffix=".json", delete=False)
+        json.dump(self.script, self._script_file)
+        self._script_file.close()
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                STUB_SERVER,
+                "--port", str(self.port),
+                "--script", self._script_file.name,
+                "--latency", str(self.latency),
+                "--token-rate", str(self.token_rate),
+                "--prompt-rate", str(self.prompt_rate),
+            ]
+        )
+        deadline = time.monotonic() + 15
+        while True:
+            try:
+                self._request("GET", "/v1/models")
+                break
+            except OSError:
+                if time.monotonic() > deadline or self.process.poll() is not None:
+                    self.__exit__(None, None, None)
+                    raise RuntimeError("Stub server did not start")
+                time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait()
+        os.unlink(self._script_file.name)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    def _request(self, method, path):
+        request = urllib.request.Request(f"http://127.0.0.1:{self.port}{path}", method=method)
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return json.loads(response.read())
+
+    def stats(self):
+        return self._request("GET", "/stats")
+
+    def reset(self):
+        return self._request("POST", "/reset")
+
+
+def _load_script_module(name, filename):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _reset_state(workspace):
+    """Puts the crews back to a fresh start between runs."""
+    from agents import CoordinationCrew
+    from agents_v2 import TaskRepository
+    from tools.memo import tool_memo
+
+    TaskRepository.clear_all_tasks()
+    CoordinationCrew.dynamic_tasks.clear()
+    tool_memo.reset()
+    for name in ("hello.txt", "world.txt", "context.compact.json"):
+        path = os.path.join(workspace, name)
+        if os.path.exists(path):
+            os.unlink(path)
+    shutil.copy(os.path.join(REPO_ROOT, "context.md"), os.path.join(workspace, "context.md"))
+
+
+def _crew_v2():
+    _load_script_module("crew_test_v2", "crew-test-v2.py").engage_crew_with_tasks()
+
+
+def _pipelined():
+    from agent_registry import AgentRegistry
+    from orchestrator import PipelinedOrchestrator
+
+    AgentRegistry.reset()
+    asyncio.run(PipelinedOrchestrator().run())
+
+
+def _coordination():
+    from agents import CoordinationCrew
+
+    CoordinationCrew().run_crew()
+
+
+def _tool_calls():
+    """(tool, input) pairs run by the tools scenario, over the generated fixture."""
+    from tools.file_tools import FileTools
+    from tools.git_tools import GitTools
+    from tools.search_tools import SearchTools
+    from tools.task_tools import TaskManagerTools, TaskRepositoryTools
+
+    return [
+        (FileTools.list_files, "fixture|depth=all"),
+        (FileTools.read_file, "fixture/module_7.py"),
+        (FileTools.read_file, "fixture/module_7.py|lines=10-20"),
+        (FileTools.check_if_file_exists, "fixture/module_3.py"),
+        (SearchTools.search_files, "needle_42|path=fixture"),
+        (SearchTools.search_files, r"def function_\d+_3\b|regex|path=fixture"),
+        (GitTools.git_status, "fixture"),
+        (GitTools.git_log, "5"),
+        (GitTools.git_diff, "fixture"),
+        (GitTools.git_show_file, "HEAD:fixture/module_1.py"),
+        (TaskManagerTools.read_context, "context"),
+        (TaskManagerTools.read_tasks, "TODO"),
+        (TaskRepositoryTools.get_current_tasks, "executor"),
+    ]
+
+
+def _make_fixture(workspace, files=200):
+    """Writes a small committed source tree for the tools to work on."""
+    fixture = os.path.join(workspace, "fixture")
+    os.makedirs(fixture)
+    for number in range(files):
+        with open(os.path.join(fixture, f"module_{number}.py"), "w") as f:
+            for line in range(40):
+                f.write(f"def function_{number}_{line}():\n    return 'needle_{number * 40 + line}'\n")
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run([*git, "init", "-q"], cwd=workspace, check=True)
+    subprocess.run([*git, "add", "fixture"], cwd=workspace, check=True)
+    subprocess.run([*git, "commit", "-q", "-m", "fixture"], cwd=workspace, check=True)
+
+
+def _tools(calls_per_tool):
+    per_tool = {}
+    for tool, tool_input in _tool_calls():
+        started = time.perf_counter()
+        for _ in range(calls_per_tool):
+            tool.run(tool_input)
+        elapsed = time.perf_counter() - started
+        per_tool[f"{tool.name}({tool_input})"] = round(elapsed / calls_per_tool * 1e6, 1)
+    return per_tool
+
+
+def _measure(run, stub, workspace):
+    """Runs one scenario and returns its timings, the model's share and call counts."""
+    from accounting import UsageTracker
+    from tools.memo import tool_memo
+
+    _reset_state(workspace)
+    if stub:
+        stub.reset()
+    usage = UsageTracker().install()
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    result = run()
+    cpu = time.process_time() - cpu_started
+    wall = time.perf_counter() - wall_started
+    model = stub.stats() if stub else {"requests": 0, "model_seconds": 0.0}
+    kinds = [record["kind"] for record in usage.records]
+    llm_records = [record for record in usage.records if record["kind"] == "llm"]
+    prompt_tokens = sum(record["prompt_tokens"] or 0 for record in llm_records)
+    cached_tokens = sum(record.get("cached_tokens") or 0 for record in llm_records)
+    memo = tool_memo.stats().values()
+    memo_hits = sum(counts["hits"] for counts in memo)
+    memo_calls = memo_hits + sum(counts["misses"] for counts in memo)
+    return {
+        "wall": wall,
+        "cpu": cpu,
+        "model": model["model_seconds"],
+        "llm_calls": kinds.count("llm"),
+        "tool_calls": kinds.count("tool"),
+        "requests": model["requests"],
+        "cached_ratio": cached_tokens / prompt_tokens if prompt_tokens else 0.0,
+        "memo_ratio": memo_hits / memo_calls if memo_calls else 0.0,
+        "result": result,
+    }
+
+
+def _allocations(run, workspace):
+    _reset_state(workspace)
+    tracemalloc.start()
+    try:
+        run()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"alloc_peak_kb": round(peak / 1024, 1), "alloc_retained_kb": round(current / 1024, 1)}
+
+
+def run_scenario(name, run, stub, workspace, repeat, quiet):
+    output = io.StringIO() if quiet else sys.stdout
+    with contextlib.redirect_stdout(output):
+        # the first run warms imports, sockets and caches and is not counted
+        _measure(run, stub, workspace)
+        runs = [_measure(run, stub, workspace) for _ in range(repeat)]
+        allocations = _allocations(run, workspace)
+    wall = statistics.median(r["wall"] for r in runs)
+    cpu = statistics.median(r["cpu"] for r in runs)
+    model = statistics.median(r["model"] for r in runs)
+    llm_calls = runs[-1]["llm_calls"]
+    tool_calls = runs[-1]["tool_calls"]
+    row = {
+        "runs": repeat,
+        "wall_seconds": round(wall, 4),
+        "wall_stdev": round(statistics.stdev(r["wall"] for r in runs), 4) if repeat > 1 else 0.0,
+        "cpu_seconds": round(cpu, 4),
+        "model_seconds": round(model, 4),
+        # negative when model calls overlap, as in the pipelined orchestrator
+        "overhead_seconds": round(wall - model, 4),
+        "llm_calls": llm_calls,
+        "tool_calls": tool_calls,
+        "llm_calls_per_second": round(llm_calls / wall, 2) if wall else 0.0,
+        "tool_calls_per_second": round(tool_calls / wall, 2) if wall else 0.0,
+        "cached_prompt_ratio": round(runs[-1]["cached_ratio"], 3),
+        "tool_memo_hit_ratio": round(runs[-1]["memo_ratio"], 3),
+        **allocations,
+    }
+    if isinstance(runs[-1]["result"], dict):
+        row["per_call_us"] = runs[-1]["result"]
+    return row
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline, current):
+    """Prints the change of every metric against a previous baseline."""
+    print("--------------------------------------------------")
+    print(f"Compared with {baseline['meta'].get('revision')} ({baseline['meta'].get('created')}):")
+    for name, row in current["scenarios"].items():
+        old = baseline["scenarios"].get(name)
+        if old is None:
+            print(f"{name}: not in baseline")
+            continue
+        print(f"{name}:")
+        for metric, value in row.items():
+            previous = old.get(metric)
+            if not isinstance(value, (int, float)) or not isinstance(previous, (int, float)):
+                continue
+            change = f"{(value - previous) / previous * 100:+.1f}%" if previous else "n/a"
+            print(f"- {metric}: {previous} -> {value} ({change})")
+        for call, value in row.get("per_call_us", {}).items():
+            previous = old.get("per_call_us", {}).get(call)
+            if previous:
+                print(f"- {call}: {previous}us -> {value}us ({(value - previous) / previous * 100:+.1f}%)")
+    print("--------------------------------------------------")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Orchestration overhead benchmarks")
+    parser.add_argument("--scenarios", default="crew_v2,pipelined,coordination,tools")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--rounds", type=int, default=2, help="CoordinationCrew rounds per run")
+    parser.add_argument("--tool-calls", type=int, default=50, help="calls per tool in the tools scenario")
+    parser.add_argument("--latency", type=float, default=0.05, help="stub seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="stub completion tokens per second")
+    parser.add_argument(
+        "--prompt-rate", type=float, default=0.0, help="stub uncached prompt tokens per second, 0 for free"
+    )
+    parser.add_argument("--script", help="JSON file with stub response rules, replaces the default script")
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, ".cache", "benchmark.json"))
+    parser.add_argument("--compare", help="previous benchmark JSON to diff against")
+    parser.add_argument("--verbose", action="store_true", help="keep the crews' console output")
+    args = parser.parse_args()
+
+    if args.script:
+        with open(args.script, "r") as f:
+            script = json.load(f)
+    else:
+        script = default_script(args.rounds)
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    workspace = tempfile.mkdtemp(prefix="teamwork-bench-")
+    results = {
+        "meta": {
+            "revision": _git_revision(),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": args.latency,
+            "token_rate": args.token_rate,
+            "prompt_rate": args.prompt_rate,
+            "prompt_layout": os.environ.get("PROMPT_LAYOUT", "prefix"),
+            # the tools scenario times memo hits unless TOOL_MEMO=0
+            "tool_memo": os.environ.get("TOOL_MEMO", "1") == "1",
+            "repeat": args.repeat,
+            "rounds": args.rounds,
+        },
+        "scenarios": {},
+    }
+
+    with StubProcess(script, args.latency, args.token_rate, args.prompt_rate) as stub:
+        # the crews resolve their model and files from the environment and cwd
+        os.environ["OPENAI_API_BASE"] = stub.base_url
+        os.environ["OPENAI_API_KEY"] = "NA"
+        os.environ["TASK_LEDGER_EXPORT"] = "0"
+        sys.path.insert(0, REPO_ROOT)
+        os.chdir(workspace)
+        try:
+            _make_fixture(workspace)
+            runners = {
+                "crew_v2": (_crew_v2, stub),
+                "pipelined": (_pipelined, stub),
+                "coordination": (_coordination, stub),
+                "tools": (lambda: _tools(args.tool_calls), None),
+            }
+            for name in scenarios:
+                if name not in runners:
+                    parser.error(f"Unknown scenario: {name}, expected one of {', '.join(runners)}")
+                run, scenario_stub = runners[name]
+                print(f"Running {name}...", file=sys.stderr)
+                results["scenarios"][name] = run_scenario(
+                    name, run, scenario_stub, workspace, args.repeat, not args.verbose
+                )
+        finally:
+            os.chdir(REPO_ROOT)
+            shutil.rmtree(workspace, ignore_errors=True)
+
+    print(json.dumps(results, indent=2))
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare, "r") as f:
+            compare(json.load(f), results)
+
+
+if __name__ == "__main__":
+    main()
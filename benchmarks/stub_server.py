@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import json
+import os
+import re
+import time
+import uuid
+from aiohttp import web
+
+
+class Script:
+    """Scripted responses for the stub server.
+
+    A script is a list of rules, the first rule whose `match` regex is found in
+    the prompt answers the call. The response is picked by the agent's step,
+    the number of observations after the prompt's "Current Task:", so a ReAct
+    loop can take an action and then give a final answer. A rule with `times`
+    is skipped once it has answered that many calls. Anything unmatched gets
+    the default response.
+    """
+
+    DEFAULT_RESPONSE = "Thought: Do I need to use a tool? No\nFinal Answer: Done."
+
+    def __init__(self, rules=(), default=DEFAULT_RESPONSE):
+        self.rules = [
+            {**rule, "pattern": re.compile(rule["match"], re.DOTALL)} for rule in rules
+        ]
+        self.default = default
+        self.counts = [0] * len(self.rules)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r") as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return cls(data)
+        return cls(data.get("rules", []), data.get("default", cls.DEFAULT_RESPONSE))
+
+    def reset(self):
+        self.counts = [0] * len(self.rules)
+
+    def respond(self, prompt):
+        step = prompt.rsplit("Current Task:", 1)[-1].count("Observation:")
+        for index, rule in enumerate(self.rules):
+            if "times" in rule and self.counts[index] >= rule["times"]:
+                continue
+            if rule["pattern"].search(prompt):
+                self.counts[index] += 1
+                responses = rule["responses"]
+                return responses[min(step, len(responses) - 1)]
+        return self.default
+
+
+def _tokens(text):
+    # a rough count is enough for a stand-in model
+    return max(len(text) // 4, 1)
+
+
+class StubServer:
+    """OpenAI-compatible chat completions server standing in for text-generation-webui.
+
+    Each call sleeps for `latency` seconds before the first token and then
+    produces tokens at `token_rate` per second, so the time a run spends in
+    the model is known exactly: it is reported as `model_seconds` by /stats.
+    With a `prompt_rate` the prompt tokens not shared with the previous
+    prompt are also evaluated at that rate, like a single-slot KV cache, and
+    the shared ones are reported as cached.
+    """
+
+    def __init__(self, script=None, latency=0.05, token_rate=200.0, prompt_rate=0.0):
+        self.script = script or Script()
+        self.latency = latency
+        self.token_rate = token_rate
+        self.prompt_rate = prompt_rate
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self._last_prompt = ""
+        self.completion_tokens = 0
+        self.model_seconds = 0.0
+
+    def app(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_post("/chat/completions", self.chat_completions)
+        app.router.add_get("/v1/models", self.models)
+        app.router.add_get("/stats", self.stats)
+        app.router.add_post("/reset", self.reset)
+        return app
+
+    async def chat_completions(self, request):
+        body = await request.json()
+        prompt = "\n".join(str(message.get("content", "")) for message in body.get("messages", []))
+        content = self.script.respond(prompt)
+        for stop in body.get("stop") or ():
+            if stop in content:
+                content = content[: content.index(stop)]
+        prompt_tokens = _tokens(prompt)
+        completion_tokens = _tokens(content)
+        shared = len(os.path.commonprefix([self._last_prompt, prompt]))
+        cached_tokens = min(shared // 4, prompt_tokens)
+        self._last_prompt = prompt
+        prompt_seconds = (prompt_tokens - cached_tokens) / self.prompt_rate if self.prompt_rate else 0.0
+        self.requests += 1
+        self.prompt_tokens += prompt_tokens
+        self.cached_tokens += cached_tokens
+        self.completion_tokens += completion_tokens
+        self.model_seconds += self.latency + prompt_seconds + completion_tokens / self.token_rate
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "stub")
+
+        await asyncio.sleep(self.latency + prompt_seconds)
+        if not body.get("stream"):
+            await asyncio.sleep(completion_tokens / self.token_rate)
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                        "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                    },
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        pieces = re.findall(r"\S+\s*|\s+", content) or [""]
+        delay = completion_tokens / self.token_rate / len(pieces)
+        for index, piece in enumerate(pieces):
+            last = index == len(pieces) - 1
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                        "finish_reason": "stop" if last else None,
+                    }
+                ],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(delay)
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def models(self, request):
+        return web.json_response({"object": "list", "data": [{"id": "stub", "object": "model"}]})
+
+    async def stats(self, request):
+        return web.json_response(
+            {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "model_seconds": round(self.model_seconds, 6),
+            }
+        )
+
+    async def reset(self, request):
+        self.script.reset()
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.model_seconds = 0.0
+        self._last_prompt = ""
+        return web.json_response({"ok": True})
+
+
+def serve(port, script_path=None, latency=0.05, token_rate=200.0, prompt_rate=0.0, host="127.0.0.1"):
+    """Runs the stub server until interrupted."""
+    script = Script.load(script_path) if script_path else Script()
+    server = StubServer(script, latency=latency, token_rate=token_rate, prompt_rate=prompt_rate)
+    web.run_app(server.app(), host=host, port=port, print=None)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub server for benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5001)
+    parser.add_argument("--script", help="JSON file with scripted response rules")
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before the first token")
+    parser.add_argument("--token-rate", type=float, default=200.0, help="completion tokens per second")
+    parser.add_argument("--prompt-rate", type=float, default=0.0, help="uncached prompt tokens per second, 0 for free")
+    args = parser.parse_args()
+    serve(args.port, args.script, args.latency, args.token_rate, args.prompt_rate, args.host)
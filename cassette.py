@@ -0,0 +1,239 @@
+import difflib
+import functools
+import gzip
+import hashlib
+import json
+import os
+import threading
+from langchain.globals import set_llm_cache
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.tools import BaseTool
+
+
+class CassetteDivergence(RuntimeError):
+    """Raised in replay mode when a call has no recorded counterpart."""
+
+
+class Cassette(BaseCache):
+    """Records or replays every LLM response and tool observation of a run.
+
+    In record mode the cassette sits in front of the model as the global
+    langchain cache (always missing, storing every response) and wraps the tool
+    functions to capture their observations. In replay mode LLM calls are served
+    from the recording in order, with no model attached, and environment tools
+    (files, git, search) return their recorded observations. Orchestration tools
+    (task repositories, context) still run so the loop under test is exercised,
+    and their output is compared with the recording. Every mismatch is reported
+    as a divergence.
+    """
+
+    def __init__(self, path, mode="record"):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Invalid cassette mode: {mode}, must be record or replay")
+        self.path = path
+        self.mode = mode
+        self.entries = []
+        self.divergences = []
+        self._llm_cursor = 0
+        self._tool_cursor = 0
+        self._used = set()
+        self._installed = False
+        self._lock = threading.Lock()
+        if mode == "replay":
+            with gzip.open(path, "rt") as file:
+                self.entries = [json.loads(line) for line in file]
+
+    @staticmethod
+    def _key(prompt, llm_string):
+        return hashlib.sha256(json.dumps([llm_string, prompt]).encode()).hexdigest()
+
+    def _next(self, kind, matches, cursor_name):
+        """Returns the next unused entry of a kind, preferring one that matches the call."""
+        cursor = getattr(self, cursor_name)
+        candidates = [
+            index
+            for index, entry in enumerate(self.entries)
+            if entry["kind"] == kind and index not in self._used
+        ]
+        expected = next((index for index in candidates if index >= cursor), None)
+        if expected is not None and matches(self.entries[expected]):
+            chosen = expected
+        else:
+            chosen = next((index for index in candidates if matches(self.entries[index])), None)
+        if chosen is not None:
+            self._used.add(chosen)
+            setattr(self, cursor_name, chosen + 1)
+        return expected, chosen
+
+    def _diverge(self, kind, position, expected, actual):
+        expected = expected or ""
+        diff = next(
+            (
+                line
+                for line in difflib.unified_diff(
+                    expected.splitlines(), actual.splitlines(), "recorded", "replayed", n=0, lineterm=""
+                )
+                if line.startswith(("-", "+")) and not line.startswith(("---", "+++"))
+            ),
+            "",
+        )
+        self.divergences.append(
+            {"kind": kind, "position": position, "first_difference": diff[:300]}
+        )
+
+    # llm cache interface
+
+    def lookup(self, prompt, llm_string):
+        if self.mode == "record":
+            return None
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            expected, chosen = self._next("llm", lambda entry: entry["key"] == key, "_llm_cursor")
+            if chosen is None or chosen != expected:
+                recorded = self.entries[expected]["prompt"] if expected is not None else None
+                self._diverge("llm", expected, recorded, prompt)
+            if chosen is None:
+                raise CassetteDivergence(
+                    f"No recorded LLM response for call {self._llm_cursor}, see divergence report"
+                )
+            generations = self.entries[chosen]["generations"]
+        return [loads(generation) for generation in generations]
+
+    def update(self, prompt, llm_string, return_val):
+        if self.mode != "record":
+            return
+        with self._lock:
+            self.entries.append(
+                {
+                    "kind": "llm",
+                    "key": self._key(prompt, llm_string),
+                    "prompt": prompt,
+                    "generations": [dumps(generation) for generation in return_val],
+                }
+            )
+
+    def clear(self, **kwargs):
+        pass
+
+    # tools
+
+    def wrap_tool(self, tool, replay):
+        """Wraps a tool's function to record, replay or compare its observations."""
+        func = tool.func
+        if getattr(func, "cassette", None) is self:
+            return
+        # an earlier cassette's wrapper is replaced, not wrapped again
+        func = getattr(func, "unwrapped_func", func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            tool_input = json.dumps([args, kwargs], default=str, sort_keys=True)
+            if self.mode == "record":
+                output = func(*args, **kwargs)
+                with self._lock:
+                    self.entries.append(
+                        {"kind": "tool", "name": tool.name, "input": tool_input, "output": str(output)}
+                    )
+                return output
+
+            def matches(entry):
+                return entry["name"] == tool.name and entry["input"] == tool_input
+
+            with self._lock:
+                expected, chosen = self._next("tool", matches, "_tool_cursor")
+                if chosen is None or chosen != expected:
+                    recorded = self.entries[expected] if expected is not None else {}
+                    self._diverge(
+                        f"tool {tool.name}",
+                        expected,
+                        f"{recorded.get('name')}({recorded.get('input')})",
+                        f"{tool.name}({tool_input})",
+                    )
+            if not replay:
+                output = func(*args, **kwargs)
+                if chosen is not None and str(output) != self.entries[chosen]["output"]:
+                    self._diverge(
+                        f"tool {tool.name} output", chosen, self.entries[chosen]["output"], str(output)
+                    )
+                return output
+            if chosen is None:
+                raise CassetteDivergence(
+                    f"No recorded observation for {tool.name}({tool_input}), see divergence report"
+                )
+            return self.entries[chosen]["output"]
+
+        wrapper.cassette = self
+        wrapper.unwrapped_func = func
+        tool.func = wrapper
+
+    def install(self):
+        """Installs the cassette as the global LLM cache and wraps every tool, once."""
+        if self._installed:
+            return self
+        from tools.file_tools import FileTools
+        from tools.git_tools import GitTools
+        from tools.search_tools import SearchTools
+        from tools.task_tools import (
+            CrewTaskTools,
+            TaskManagerTools,
+            TaskRepositoryTools,
+            TaskStatuses,
+        )
+
+        set_llm_cache(self)
+        for tool_class, replay in (
+            (FileTools, True),
+            (GitTools, True),
+            (SearchTools, True),
+            (TaskManagerTools, False),
+            (TaskRepositoryTools, False),
+            (CrewTaskTools, False),
+            (TaskStatuses, False),
+        ):
+            for value in vars(tool_class).values():
+                if isinstance(value, BaseTool) and getattr(value, "func", None):
+                    self.wrap_tool(value, replay and self.mode == "replay")
+        self._installed = True
+        return self
+
+    def save(self):
+        """Writes the recording as gzipped JSON lines."""
+        if self.mode != "record":
+            return None
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with gzip.open(self.path, "wt") as file:
+            for entry in self.entries:
+                file.write(json.dumps(entry) + "\n")
+        return self.path
+
+    def report(self):
+        """Prints a summary of the recording or of where the replay diverged."""
+        llm_calls = sum(1 for entry in self.entries if entry["kind"] == "llm")
+        tool_calls = len(self.entries) - llm_calls
+        print("--------------------------------------------------")
+        print(f"Cassette ({self.mode}): {self.path}")
+        print(f"{llm_calls} LLM responses, {tool_calls} tool observations")
+        if self.mode == "replay":
+            unused = len(self.entries) - len(self._used)
+            print(f"{len(self._used)} entries replayed, {unused} unused, {len(self.divergences)} divergences")
+            for divergence in self.divergences:
+                print(
+                    f"- {divergence['kind']} at recorded position {divergence['position']}: "
+                    f"{divergence['first_difference']}"
+                )
+        print("--------------------------------------------------")
+
+
+def use_cassette_from_env():
+    """Installs a cassette when CREW_CASSETTE is set, mode from CREW_CASSETTE_MODE."""
+    path = os.environ.get("CREW_CASSETTE")
+    if not path:
+        return None
+    mode = os.environ.get("CREW_CASSETTE_MODE", "record")
+    if mode == "replay":
+        # the model is never called, but the client still wants a key
+        os.environ.setdefault("OPENAI_API_KEY", "NA")
+    return Cassette(path, mode).install()
@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from textwrap import dedent
+
+
+SECTION_SEPARATOR = re.compile(r"^---$", re.MULTILINE)
+
+SUMMARY_PROMPT = dedent(
+    """\
+    Summarize the following result from an agent crew in at most {words} words.
+    Keep file names, decisions that were made and any open issues. Respond with
+    the summary only.
+
+    {text}
+    """
+)
+
+
+class ContextCompactor:
+    """Keeps the context log under a token budget with a map-reduce summary pass.
+
+    The first section of the log (the objective) and the newest sections are
+    served verbatim; older sections are summarized concurrently and the
+    summaries are merged until everything fits the budget. Section summaries and
+    the compacted text are cached next to the raw log, keyed by content hash, so
+    an append-only log only pays for the sections that are new. A summary whose
+    LLM call failed is not cached, and only the summaries of the current log,
+    at most CONTEXT_SUMMARY_CACHE_SIZE, are kept.
+    """
+
+    _instances = {}
+
+    def __init__(self, path, budget=None, recent_ratio=0.5, max_workers=None, summarize=None):
+        self.path = path
+        self.cache_path = f"{os.path.splitext(path)[0]}.compact.json"
+        self.budget = budget or int(os.environ.get("CONTEXT_TOKEN_BUDGET", 3000))
+        self.recent_budget = int(self.budget * recent_ratio)
+        self.max_workers = max_workers or int(os.environ.get("CONTEXT_COMPACTION_WORKERS", 4))
+        self.cache_size = int(os.environ.get("CONTEXT_SUMMARY_CACHE_SIZE", 256))
+        self._summarize = summarize
+        self._encoding = None
+
+    @classmethod
+    def for_path(cls, path):
+        """Returns a shared compactor for the context file."""
+        compactor = cls._instances.get(path)
+        if compactor is None:
+            compactor = cls(path)
+            cls._instances[path] = compactor
+        return compactor
+
+    def count_tokens(self, text):
+        """Counts tokens with tiktoken, estimating 4 characters per token if it is unavailable."""
+        if self._encoding is None:
+            try:
+                import tiktoken
+
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception:
+                self._encoding = False
+        if self._encoding is False:
+            return len(text) // 4
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def summarize(self, text, words=120):
+        """Summarizes one chunk of the log with the LLM."""
+        if self._summarize is not None:
+            return self._summarize(text, words)
+        from llm import build_llm
+
+        llm = build_llm(temperature=0)
+        return llm.invoke(SUMMARY_PROMPT.format(words=words, text=text)).content.strip()
+
+    def read(self):
+        """Returns the context log, compacted when it exceeds the token budget."""
+        with open(self.path, "r") as file:
+            raw = file.read()
+        if self.count_tokens(raw) <= self.budget:
+            return raw
+
+        source_hash = hashlib.sha256(raw.encode()).hexdigest()
+        cache = self._load_cache()
+        if cache.get("source_hash") == source_hash:
+            return cache["text"]
+
+        summaries = cache.get("summaries", {})
+        text, complete = self._compact(raw, summaries)
+        if complete:
+            # a fallback is not reused, the next read tries the LLM again
+            cache["source_hash"] = source_hash
+            cache["text"] = text
+        cache["summaries"] = summaries
+        self._save_cache(cache)
+        return text
+
+    def _compact(self, raw, summaries):
+        sections = [section.strip("\n") for section in SECTION_SEPARATOR.split(raw)]
+        head, results = sections[0], [section for section in sections[1:] if section]
+
+        # keep the newest results verbatim while they fit the recent budget
+        recent, used = [], 0
+        for section in reversed(results):
+            tokens = self.count_tokens(section)
+            if recent and used + tokens > self.recent_budget:
+                break
+            recent.insert(0, section)
+            used += tokens
+        older = results[: len(results) - len(recent)]
+        if not older:
+            return raw, True
+
+        # map: summarize older sections concurrently, reusing cached summaries
+        keys = [hashlib.sha256(section.encode()).hexdigest() for section in older]
+        missing = {key: section for key, section in zip(keys, older) if key not in summaries}
+        fresh = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for key, (summary, ok) in zip(missing, pool.map(self._safe_summarize, missing.values())):
+                fresh[key] = summary
+                if ok:
+                    summaries[key] = summary
+        parts = [fresh[key] if key in fresh else summaries[key] for key in keys]
+        complete = all(key in summaries for key in keys)
+        # drop summaries of sections no longer in the log, then the oldest over the cap
+        current = [key for key in dict.fromkeys(keys) if key in summaries][-self.cache_size :]
+        kept = {key: summaries[key] for key in current}
+        summaries.clear()
+        summaries.update(kept)
+
+        # reduce: merge summaries in groups until they fit what is left of the budget
+        remaining = self.budget - self.count_tokens(head) - used
+        while len(parts) > 1 and self.count_tokens("\n".join(parts)) > remaining:
+            groups = ["\n".join(parts[i : i + 4]) for i in range(0, len(parts), 4)]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                merged = list(pool.map(self._safe_summarize, groups))
+            parts = [summary for summary, _ in merged]
+            complete = complete and all(ok for _, ok in merged)
+
+        compacted = [head, "Summary of earlier results:\n" + "\n".join(parts)] + recent
+        return "\n---\n".join(compacted) + "\n", complete
+
+    def _safe_summarize(self, text):
+        """Summarizes text, returns (summary, True), or (a truncated copy, False) if the LLM call fails."""
+        try:
+            return self.summarize(text), True
+        except Exception:
+            return text[:600], False
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_cache(self, cache):
+        temp_path = f"{self.cache_path}.tmp"
+        with open(temp_path, "w") as file:
+            json.dump(cache, file)
+        os.replace(temp_path, self.cache_path)
@@ -0,0 +1,48 @@
+import asyncio
+import os
+from accounting import UsageTracker
+from agent_registry import AgentRegistry
+from cassette import use_cassette_from_env
+from llm_cache import enable_llm_cache, print_cache_stats
+from metrics import start_metrics_from_env
+from orchestrator import PipelinedOrchestrator
+from tools.git_backend import GitBackend
+from tools.memo import print_memo_stats
+
+
+# Pipelined alternative to crew-test-v2.py: the planner, executor and reviewer
+# run as concurrent stages that share the TaskRepository
+async def engage_crew_pipelined():
+
+    # start a fresh agent registry, tools resolve the same agents below
+    AgentRegistry.reset()
+
+    orchestrator = PipelinedOrchestrator()
+    await orchestrator.run()
+
+    print("--------------------------------------------------")
+    print(f"Pipelined run finished after {len(orchestrator.results)} stage runs")
+    print("--------------------------------------------------")
+
+
+if __name__ == "__main__":
+    # a cassette records or replays the run and takes the place of the cache
+    cassette = use_cassette_from_env()
+    llm_cache = None if cassette else enable_llm_cache()
+    usage = UsageTracker().install()
+    metrics = start_metrics_from_env(usage, llm_cache)
+    try:
+        asyncio.run(engage_crew_pipelined())
+    finally:
+        # a crashed or diverged run still keeps its recording and report
+        if cassette:
+            cassette.save()
+            cassette.report()
+        if metrics:
+            metrics.stop()
+    usage.print_summary()
+    usage.dump_jsonl(os.environ.get("USAGE_LOG_PATH", "./usage.jsonl"))
+    AgentRegistry.print_stats()
+    GitBackend.print_stats()
+    print_cache_stats(llm_cache)
+    print_memo_stats()
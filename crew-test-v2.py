@@ -1,15 +1,32 @@
+import os
 from crewai import Crew, Process, Task
+from accounting import UsageTracker, usage_scope
+from agent_registry import AgentRegistry
+from cassette import use_cassette_from_env
 from agents_v2 import TaskRepository, PlanningCrew, ExecutionCrew
+from llm_cache import enable_llm_cache, print_cache_stats
+from metrics import start_metrics_from_env
+from prompt_layout import warmup
+from tools.git_backend import GitBackend
+from tools.memo import print_memo_stats
 
 
 # Function to initialize and kick off the crew
 def engage_crew_with_tasks():
 
+    # start a fresh agent registry, tools resolve the same agents below
+    AgentRegistry.reset()
+    # tasks queued by an earlier run are not near-duplicates of this run's
+    TaskRepository.start_run()
+
     # define agents
     planner = PlanningCrew.planner_agent()
     executor = ExecutionCrew.executor_agent()
     reviewer = ExecutionCrew.reviewer_agent()
-    # decider = ExecutionCrew.decider_agent()
+    # decider tasks skip the agent loop, see ExecutionCrew.decide()
+
+    # evaluate the static prompt prefixes before the first crew pass
+    warmup([planner, executor, reviewer])
 
     # define the initial task for the planner
     initial_task = Task(
@@ -20,62 +37,32 @@ def engage_crew_with_tasks():
     TaskRepository.planner_tasks.append(initial_task)
 
     # loop as long as the planner has tasks
+    iteration = 0
     while TaskRepository.planner_tasks:
-        # planner has a tool to read the context
-        # planner has a tool to read the current shared tasks
-        # planner has a tool to create tasks for the executor, reviewer, and decider agents
-        # tasks are Task() objects that should be added to tasks list
-        planning_crew = Crew(
-            agents=[planner],
-            process=Process.sequential,
-            tasks=TaskRepository.planner_tasks,
-            verbose=True,
-        )
-
-        # run the crew
-        planning_result = planning_crew.kickoff()
-
-        # clear the planner task list
-        TaskRepository.planner_tasks.clear()
-
-        # print the result
-        print("--------------------------------------------------")
-        print("Planning Crew Result:")
-        print(planning_result)
-        print("--------------------------------------------------")
-        print("Planner Tasks:")
-        for task in TaskRepository.planner_tasks:
-            print(f"- {task.description}")
-        print("Executor Tasks:")
-        for task in TaskRepository.executor_tasks:
-            print(f"- {task.description}")
-        print("Reviewer Tasks:")
-        for task in TaskRepository.reviewer_tasks:
-            print(f"- {task.description}")
-        print("--------------------------------------------------")
-
-        # check if executor crew has tasks
-        if TaskRepository.executor_tasks:
-
-            # executor has file tools, can read context, add task for itself
-            # reviewer has file tools, can read context, add task for planner
-            execution_crew = Crew(
-                agents=[executor, reviewer],
+        iteration += 1
+        # attribute token and latency usage to this loop iteration
+        with usage_scope(iteration=iteration):
+            # planner has a tool to read the context
+            # planner has a tool to read the current shared tasks
+            # planner has a tool to create tasks for the executor, reviewer, and decider agents
+            # tasks are Task() objects that should be added to tasks list
+            planning_crew = Crew(
+                agents=[planner],
                 process=Process.sequential,
-                tasks=TaskRepository.executor_tasks,
+                tasks=TaskRepository.start_tasks("planner"),
                 verbose=True,
             )
 
             # run the crew
-            execution_result = execution_crew.kickoff()
+            planning_result = planning_crew.kickoff()
 
-            # clear the executor task list
-            TaskRepository.executor_tasks.clear()
+            # archive the completed planner tasks
+            TaskRepository.complete_tasks("planner", planning_result)
 
             # print the result
             print("--------------------------------------------------")
-            print("Execution Crew Result:")
-            print(execution_result)
+            print("Planning Crew Result:")
+            print(planning_result)
             print("--------------------------------------------------")
             print("Planner Tasks:")
             for task in TaskRepository.planner_tasks:
@@ -88,6 +75,66 @@ def engage_crew_with_tasks():
                 print(f"- {task.description}")
             print("--------------------------------------------------")
 
+            # check if executor crew has tasks
+            if TaskRepository.executor_tasks:
+
+                # executor has file tools, can read context, add task for itself
+                # reviewer has file tools, can read context, add task for planner
+                execution_crew = Crew(
+                    agents=[executor, reviewer],
+                    process=Process.sequential,
+                    tasks=TaskRepository.start_tasks("executor"),
+                    verbose=True,
+                )
+
+                # run the crew
+                execution_result = execution_crew.kickoff()
+
+                # archive the completed executor tasks
+                TaskRepository.complete_tasks("executor", execution_result)
+
+                # print the result
+                print("--------------------------------------------------")
+                print("Execution Crew Result:")
+                print(execution_result)
+                print("--------------------------------------------------")
+                print("Planner Tasks:")
+                for task in TaskRepository.planner_tasks:
+                    print(f"- {task.description}")
+                print("Executor Tasks:")
+                for task in TaskRepository.executor_tasks:
+                    print(f"- {task.description}")
+                print("Reviewer Tasks:")
+                for task in TaskRepository.reviewer_tasks:
+                    print(f"- {task.description}")
+                print("--------------------------------------------------")
+
+            # decider tasks are answered with one constrained completion each
+            if TaskRepository.decider_tasks:
+                print("Decider Verdicts:")
+                for description, verdict in ExecutionCrew.decide_tasks():
+                    print(f"- {description}: {verdict.decision} ({verdict.raw!r})")
+                print("--------------------------------------------------")
+
 
 if __name__ == "__main__":
-    engage_crew_with_tasks()
+    # a cassette records or replays the run and takes the place of the cache
+    cassette = use_cassette_from_env()
+    llm_cache = None if cassette else enable_llm_cache()
+    usage = UsageTracker().install()
+    metrics = start_metrics_from_env(usage, llm_cache)
+    try:
+        engage_crew_with_tasks()
+    finally:
+        # a crashed or diverged run still keeps its recording and report
+        if cassette:
+            cassette.save()
+            cassette.report()
+        if metrics:
+            metrics.stop()
+    usage.print_summary()
+    usage.dump_jsonl(os.environ.get("USAGE_LOG_PATH", "./usage.jsonl"))
+    AgentRegistry.print_stats()
+    GitBackend.print_stats()
+    print_cache_stats(llm_cache)
+    print_memo_stats()
@@ -1,5 +1,13 @@
 # engagement.py
+import os
+from accounting import UsageTracker
+from agent_registry import AgentRegistry
+from cassette import use_cassette_from_env
 from agents import CoordinationCrew
+from llm_cache import enable_llm_cache, print_cache_stats
+from metrics import start_metrics_from_env
+from tools.git_backend import GitBackend
+from tools.memo import print_memo_stats
 
 
 # Function to initialize and kick off the crew
@@ -16,4 +24,23 @@ def engage_crew_with_tasks():
 
 
 if __name__ == "__main__":
-    engage_crew_with_tasks()
+    # a cassette records or replays the run and takes the place of the cache
+    cassette = use_cassette_from_env()
+    llm_cache = None if cassette else enable_llm_cache()
+    usage = UsageTracker().install()
+    metrics = start_metrics_from_env(usage, llm_cache)
+    try:
+        engage_crew_with_tasks()
+    finally:
+        # a crashed or diverged run still keeps its recording and report
+        if cassette:
+            cassette.save()
+            cassette.report()
+        if metrics:
+            metrics.stop()
+    usage.print_summary()
+    usage.dump_jsonl(os.environ.get("USAGE_LOG_PATH", "./usage.jsonl"))
+    AgentRegistry.print_stats()
+    GitBackend.print_stats()
+    print_cache_stats(llm_cache)
+    print_memo_stats()
@@ -1,7 +1,6 @@
 # Complicated task to test models and crewAI processes
 # Sort of like a TodoMVC for local models and agent flows
 
-import os
 
 # set global vars
 from dotenv import load_dotenv
@@ -12,12 +11,17 @@ set_debug(True)
 
 from crewai import Agent, Crew, Process, Task
 
-# create a default language model
-from langchain_openai import ChatOpenAI
+# cache responses on disk, identical prompts give identical completions
+from llm_cache import enable_llm_cache, print_cache_stats
 
-default_llm = ChatOpenAI(
-    model=os.environ.get("OPENAI_MODEL_NAME"),
-)
+llm_cache = enable_llm_cache()
+
+# create a default language model, every agent shares its pooled HTTP client
+from llm import agent_llm, build_llm
+from prompt_layout import prompt_i18n, warmup
+from tools.toolset import toolset
+
+default_llm = build_llm()
 
 # setup file logging and callback
 from loguru import logger
@@ -28,6 +32,16 @@ log_file = f"{log_timestamp}-fitness_app.log"
 
 logger.add(log_file, colorize=True, enqueue=True)
 
+# record tokens and latency for every LLM and tool call, per agent role
+from accounting import UsageTracker
+
+usage = UsageTracker().install()
+
+# opt-in live metrics, METRICS_PORT and/or METRICS_TEXTFILE
+from metrics import start_metrics_from_env
+
+metrics = start_metrics_from_env(usage, llm_cache)
+
 
 def custom_step_callback(output: str):
     """
@@ -48,7 +62,8 @@ manager_agent = Agent(
     backstory="An experienced manager with a knack for understanding user needs and translating them into actionable development tasks.",
     verbose=True,
     allow_delegation=True,
-    # llm=default_llm,
+    llm=agent_llm("Manager"),
+    i18n=prompt_i18n(),
 )
 
 # overall objective: Create a fitness app
@@ -91,7 +106,7 @@ file_tools = FileManagementToolkit(root_dir=str(working_directory.name)).get_too
 file_agent = Agent(
     role="File System Agent",
     goal="Create and manage files and directories.",
-    tools=file_tools,
+    tools=toolset(*file_tools),
     backstory=dedent(
         """\
     You are a file system agent with the ability to create, manage, and delete files and directories.
@@ -101,7 +116,8 @@ file_agent = Agent(
     ),
     allow_delegation=False,
     verbose=True,
-    # llm=default_llm,
+    llm=agent_llm("File System Agent"),
+    i18n=prompt_i18n(),
 )
 
 # create agent with shell access
@@ -130,19 +146,16 @@ file_agent = Agent(
 
 # create agent with internet search tools
 
-from langchain_community.tools import WikipediaQueryRun
-from langchain_community.utilities import WikipediaAPIWrapper
-
-wikipedia_tool = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+# built on their first call, so their packages are not imported at startup
+from tools.all_tools import get_tool, print_import_stats
 
-from langchain_community.tools import DuckDuckGoSearchRun
-
-duckduckgo_search_tool = DuckDuckGoSearchRun()
+wikipedia_tool = get_tool("wikipedia")
+duckduckgo_search_tool = get_tool("duckduckgo_search")
 
 internet_research_agent = Agent(
     role="Internet Research Agent",
     goal="Search the internet for information.",
-    tools=[wikipedia_tool, duckduckgo_search_tool],
+    tools=toolset(wikipedia_tool, duckduckgo_search_tool),
     backstory=dedent(
         """\
         You are an internet research agent with the ability to search the internet for information.
@@ -151,7 +164,8 @@ internet_research_agent = Agent(
     ),
     allow_delegation=False,
     verbose=True,
-    # llm=default_llm,
+    llm=agent_llm("Internet Research Agent"),
+    i18n=prompt_i18n(),
 )
 
 # h/t to @pythonbyte for the SDLC agent template here
@@ -160,40 +174,44 @@ product_manager_agent = Agent(
     role="Product Manager",
     goal="Identify user requirements and coordinate the software development process.",
     backstory="An experienced product manager with a knack for understanding user needs and translating them into actionable development tasks.",
-    tools=[duckduckgo_search_tool],
+    tools=toolset(duckduckgo_search_tool),
     verbose=True,
     allow_delegation=True,
-    # llm=default_llm,
+    llm=agent_llm("Product Manager"),
+    i18n=prompt_i18n(),
 )
 
 qa_software_engineer_agent = Agent(
     role="QA Software Engineer",
     goal="Create a comprehensive test suite and implement the code for all the test cases. Use the file agent to read and save file data.",
     backstory="A meticulous QA engineer with a keen eye for detail and a passion for delivering high-quality software.",
-    tools=[duckduckgo_search_tool],
+    tools=toolset(duckduckgo_search_tool),
     verbose=True,
     allow_delegation=True,
-    # llm=default_llm,
+    llm=agent_llm("QA Software Engineer"),
+    i18n=prompt_i18n(),
 )
 
 sr_software_engineer_agent = Agent(
     role="Sr Software Engineer",
     goal="Write the code to implement the features based on requirements. Use the file agent to read and save file data.",
     backstory="A seasoned software engineer with a wealth of experience in developing software solutions across various domains.",
-    tools=[duckduckgo_search_tool],
+    tools=toolset(duckduckgo_search_tool),
     verbose=True,
     allow_delegation=True,
-    # llm=default_llm,
+    llm=agent_llm("Sr Software Engineer"),
+    i18n=prompt_i18n(),
 )
 
 software_auditor_agent = Agent(
     role="Software Auditor",
     goal="Evaluate the software and ensure it meets the specified requirements.",
     backstory="A diligent auditor with a strong background in software development and quality assurance, committed to delivering high-quality software.",
-    tools=[duckduckgo_search_tool],
+    tools=toolset(duckduckgo_search_tool),
     verbose=True,
     allow_delegation=True,
-    # llm=default_llm,
+    llm=agent_llm("Software Auditor"),
+    i18n=prompt_i18n(),
 )
 
 # create a crew to achieve the objective
@@ -216,12 +234,20 @@ crew = Crew(
 
 # run the crew and log result
 
+warmup(crew.agents)
 result = crew.kickoff()
 
 print("--------------------------------------------------")
 print("Final Result:\n")
 print(result)
 
+print_cache_stats(llm_cache)
+print_import_stats()
+usage.print_summary()
+usage.dump_jsonl(f"{log_timestamp}-fitness_app_usage.jsonl")
+if metrics:
+    metrics.stop()
+
 result_logfile = f"{log_timestamp}-fitness_app_final_result.log"
 
 with open(result_logfile, "w") as f:
@@ -0,0 +1,110 @@
+import atexit
+import os
+import threading
+import httpx
+import openai
+from langchain_openai import ChatOpenAI
+from accounting import usage_tracker_var
+
+# crewAI builds ChatOpenAI(model="gpt-4") for agents without an llm
+CREWAI_DEFAULT_MODEL = "gpt-4"
+
+_clients = {}
+_http_clients = {}
+_lock = threading.Lock()
+
+
+def _pool_settings():
+    limits = httpx.Limits(
+        max_connections=int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", 20)),
+        max_keepalive_connections=int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", 10)),
+        keepalive_expiry=float(os.environ.get("LLM_POOL_KEEPALIVE_EXPIRY", 60)),
+    )
+    timeout = httpx.Timeout(
+        float(os.environ.get("LLM_TIMEOUT", 600)),
+        connect=float(os.environ.get("LLM_CONNECT_TIMEOUT", 10)),
+    )
+    return limits, timeout
+
+
+def _count_attempt(request):
+    # the openai client retries below langchain, so retries are counted per request
+    tracker = usage_tracker_var.get()
+    if tracker is not None:
+        tracker.on_http_request()
+
+
+async def _acount_attempt(request):
+    _count_attempt(request)
+
+
+def http_clients():
+    """Returns the process-wide (sync, async) httpx clients with a keep-alive connection pool."""
+    with _lock:
+        if not _http_clients:
+            limits, timeout = _pool_settings()
+            _http_clients["sync"] = httpx.Client(
+                limits=limits, timeout=timeout, event_hooks={"request": [_count_attempt]}
+            )
+            _http_clients["async"] = httpx.AsyncClient(
+                limits=limits, timeout=timeout, event_hooks={"request": [_acount_attempt]}
+            )
+        return _http_clients["sync"], _http_clients["async"]
+
+
+def _openai_clients(api_key, base_url):
+    """Returns the (sync, async) chat completion clients for an endpoint, sharing the pool."""
+    key = (api_key, base_url)
+    with _lock:
+        clients = _clients.get(key)
+    if clients is not None:
+        return clients
+    sync_http, async_http = http_clients()
+    _, timeout = _pool_settings()
+    params = {"api_key": api_key, "base_url": base_url, "timeout": timeout}
+    clients = (
+        openai.OpenAI(http_client=sync_http, **params).chat.completions,
+        openai.AsyncOpenAI(http_client=async_http, **params).chat.completions,
+    )
+    with _lock:
+        return _clients.setdefault(key, clients)
+
+
+def build_llm(role=None, **kwargs):
+    """Builds a chat model for the backend configured in the environment.
+
+    Every model built here shares one pooled HTTP client, so agents and crews
+    reuse open connections to the endpoint instead of setting up their own.
+    A role tags the model's calls for usage accounting.
+    """
+    params = {}
+    if os.environ.get("OPENAI_MODEL_NAME"):
+        params["model"] = os.environ["OPENAI_MODEL_NAME"]
+    params.update(kwargs)
+    # both spellings are popped, only one may reach ChatOpenAI
+    api_key, openai_api_key = params.pop("api_key", None), params.pop("openai_api_key", None)
+    api_key = api_key or openai_api_key or os.environ.get("OPENAI_API_KEY")
+    base_url, openai_api_base = params.pop("base_url", None), params.pop("openai_api_base", None)
+    base_url = base_url or openai_api_base or os.environ.get("OPENAI_API_BASE")
+    client, async_client = _openai_clients(api_key, base_url)
+    if role:
+        params["tags"] = [*params.get("tags", []), f"role:{role}"]
+    return ChatOpenAI(
+        client=client,
+        async_client=async_client,
+        openai_api_key=api_key,
+        openai_api_base=base_url,
+        **params,
+    )
+
+
+def agent_llm(role):
+    """Chat model for a crewAI agent, on the model crewAI would pick unless one is configured."""
+    return build_llm(role=role, model=os.environ.get("OPENAI_MODEL_NAME", CREWAI_DEFAULT_MODEL))
+
+
+@atexit.register
+def _close_http_clients():
+    sync_http = _http_clients.get("sync")
+    if sync_http is not None:
+        sync_http.close()
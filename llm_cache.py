@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from langchain.globals import set_llm_cache
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+
+
+DEFAULT_CACHE_PATH = "./.cache/llm_cache.sqlite"
+DEFAULT_MAX_MB = 512
+
+
+class DiskLLMCache(BaseCache):
+    """Content-addressed, size-bounded LRU cache for LLM responses stored in sqlite.
+
+    Langchain hands every lookup the serialized message list (`prompt`) and a
+    string describing the model and call parameters (`llm_string`), which
+    includes the model name, temperature, model_kwargs (seed) and the stop
+    sequences. Both are hashed together with a namespace so that backend-side
+    settings that never reach the client (e.g. the seed configured in the web
+    UI) can still be part of the key.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=None, namespace=""):
+        self.path = path
+        self.max_bytes = max_bytes or DEFAULT_MAX_MB * 1024 * 1024
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                accessed REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)"
+        )
+        self._conn.commit()
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._total_bytes = row[0]
+
+    def _key(self, prompt, llm_string):
+        """Hashes the namespace, model parameters and messages into a cache key."""
+        payload = json.dumps([self.namespace, llm_string, prompt])
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def lookup(self, prompt, llm_string):
+        """Returns the cached generations for the prompt, or None on a miss."""
+        key = self._key(prompt, llm_string)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._conn.execute(
+                "UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return [loads(generation) for generation in json.loads(row[0])]
+
+    def update(self, prompt, llm_string, return_val):
+        """Stores the generations for the prompt and evicts least recently used entries."""
+        key = self._key(prompt, llm_string)
+        value = json.dumps([dumps(generation) for generation in return_val])
+        size = len(value.encode())
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, size, accessed) VALUES (?, ?, ?, ?)",
+                (key, value, size, time.time()),
+            )
+            self._total_bytes += size
+            self.writes += 1
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drops the least recently used entries until the cache fits its size bound."""
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    return
+
+    def clear(self, **kwargs):
+        """Removes every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def stats(self):
+        """Returns hit/miss counters and the current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
+
+
+def enable_llm_cache(path=None, max_mb=None, namespace=None):
+    """Installs the disk cache as the global langchain LLM cache.
+
+    Disabled with LLM_CACHE=0. Returns the cache instance, or None when disabled.
+    """
+    if os.environ.get("LLM_CACHE", "1") == "0":
+        return None
+    if namespace is None:
+        namespace = os.environ.get(
+            "LLM_CACHE_NAMESPACE",
+            f"{os.environ.get('OPENAI_MODEL_NAME', '')}:{os.environ.get('LLM_SEED', '')}",
+        )
+    cache = DiskLLMCache(
+        path=path or os.environ.get("LLM_CACHE_PATH", DEFAULT_CACHE_PATH),
+        max_bytes=int(
+            float(max_mb or os.environ.get("LLM_CACHE_MAX_MB", DEFAULT_MAX_MB))
+            * 1024
+            * 1024
+        ),
+        namespace=namespace,
+    )
+    set_llm_cache(cache)
+    return cache
+
+
+def print_cache_stats(cache):
+    """Prints the cache counters at the end of a run."""
+    if cache is None:
+        return
+    stats = cache.stats()
+    print("--------------------------------------------------")
+    print("LLM Cache:")
+    print(
+        f"hits: {stats['hits']}, misses: {stats['misses']}, "
+        f"hit ratio: {stats['hit_ratio']:.0%}, evictions: {stats['evictions']}, "
+        f"size: {stats['bytes'] / (1024 * 1024):.1f}/{stats['max_bytes'] / (1024 * 1024):.0f} MB"
+    )
+    print("--------------------------------------------------")
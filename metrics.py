@@ -0,0 +1,311 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict
+from aiohttp import web
+from tools.memo import tool_memo
+
+# seconds
+LLM_LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+TOOL_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    # ints as they are, floats with every digit, Prometheus parses both
+    if isinstance(value, int):
+        return str(int(value))
+    return repr(float(value))
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+class _Exposition:
+    """Builds the Prometheus text format."""
+
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        """Adds a counter or gauge, samples are (labels, value) pairs."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            self.lines.append(f"{name}{_labels(labels)} {_number(value)}")
+
+    def histogram(self, name, help_text, histogram):
+        """Adds a _Histogram."""
+        self.lines.append(f"# HELP {name} {help_text}")
+        self.lines.append(f"# TYPE {name} histogram")
+        for labels, (counts, total, count) in sorted(histogram.series.items()):
+            labels = dict(labels)
+            for bound, bucket_count in zip(histogram.buckets, counts):
+                self.lines.append(f"{name}_bucket{_labels({**labels, 'le': f'{bound:g}'})} {bucket_count}")
+            self.lines.append(f"{name}_bucket{_labels({**labels, 'le': '+Inf'})} {count}")
+            self.lines.append(f"{name}_sum{_labels(labels)} {_number(total)}")
+            self.lines.append(f"{name}_count{_labels(labels)} {count}")
+
+    def text(self):
+        return "\n".join(self.lines) + "\n"
+
+
+class _Histogram:
+    """Cumulative bucket counts, sum and count per labels tuple."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        counts, total, count = self.series.get(labels) or ([0] * len(self.buckets), 0.0, 0)
+        for position, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[position] += 1
+        self.series[labels] = (counts, total + value, count + 1)
+
+
+class MetricsExporter:
+    """Live metrics for a crew run in the Prometheus text format.
+
+    Nothing is counted twice: the LLM and tool calls, tokens, latencies and
+    loop iterations are running totals fed by the UsageTracker as each call
+    finishes, so a scrape does not depend on the number of calls. Every scrape
+    also reads the task queue depths of the TaskRepository and the LLM cache
+    and tool memo counters.
+    The metrics are served over HTTP on /metrics and/or written to a textfile
+    for node_exporter's textfile collector. `teamwork_last_activity_seconds`
+    and the in-flight gauges show a stuck run.
+    """
+
+    def __init__(self, usage, llm_cache=None, task_store=None):
+        self.usage = usage
+        self.llm_cache = llm_cache
+        self.task_store = task_store
+        self.started = time.time()
+        self._runner = None
+        self._loop = None
+        self._stop = threading.Event()
+        self._textfile = None
+        self._lock = threading.Lock()
+        self._llm_calls = defaultdict(int)
+        self._llm_errors = defaultdict(int)
+        self._tokens = defaultdict(int)
+        self._llm_latency = _Histogram(LLM_LATENCY_BUCKETS)
+        self._tool_calls = defaultdict(int)
+        self._tool_errors = defaultdict(int)
+        self._tool_latency = _Histogram(TOOL_LATENCY_BUCKETS)
+        self._iteration = 0
+        self._last_activity = self.started
+        usage.subscribe(self._observe)
+
+    def _observe(self, record):
+        """Adds a finished call to the running totals."""
+        role = record.get("role", "?")
+        latency = record["latency"] or 0.0
+        with self._lock:
+            if record["kind"] == "llm":
+                self._llm_calls[role] += 1
+                self._llm_errors[role] += 1 if record["error"] else 0
+                for kind in ("prompt", "cached", "completion"):
+                    self._tokens[(role, kind)] += record.get(f"{kind}_tokens") or 0
+                self._llm_latency.observe((("role", role),), latency)
+            else:
+                name = record.get("name", "?")
+                self._tool_calls[name] += 1
+                self._tool_errors[name] += 1 if record["error"] or record.get("returned_error") else 0
+                self._tool_latency.observe((("tool", name),), latency)
+            if isinstance(record.get("iteration"), int):
+                self._iteration = max(self._iteration, record["iteration"])
+            self._last_activity = max(self._last_activity, record["started"] + latency)
+
+    def collect(self):
+        """Returns the current metrics as Prometheus text."""
+        out = _Exposition()
+        now = time.time()
+        with self._lock:
+            self._collect_usage(out, now)
+        self._collect_state(out)
+        return out.text()
+
+    def _collect_usage(self, out, now):
+        out.metric("teamwork_uptime_seconds", "gauge", "Seconds since the metrics exporter started.", [({}, now - self.started)])
+        out.metric(
+            "teamwork_last_activity_seconds",
+            "gauge",
+            "Seconds since the last LLM or tool call finished.",
+            [({}, now - self._last_activity)],
+        )
+        out.metric("teamwork_loop_iteration", "gauge", "Latest crew loop iteration with a recorded call.", [({}, self._iteration)])
+        out.metric(
+            "teamwork_llm_calls_total",
+            "counter",
+            "LLM calls by agent role.",
+            [({"role": role}, count) for role, count in sorted(self._llm_calls.items())],
+        )
+        out.metric(
+            "teamwork_llm_errors_total",
+            "counter",
+            "Failed LLM calls by agent role.",
+            [({"role": role}, count) for role, count in sorted(self._llm_errors.items())],
+        )
+        out.metric(
+            "teamwork_llm_tokens_total",
+            "counter",
+            "LLM tokens by agent role and kind (prompt, cached, completion).",
+            [({"role": role, "kind": kind}, count) for (role, kind), count in sorted(self._tokens.items())],
+        )
+        out.histogram("teamwork_llm_latency_seconds", "LLM call latency by agent role.", self._llm_latency)
+        out.metric(
+            "teamwork_tool_calls_total",
+            "counter",
+            "Tool calls by tool name.",
+            [({"tool": name}, count) for name, count in sorted(self._tool_calls.items())],
+        )
+        out.metric(
+            "teamwork_tool_errors_total",
+            "counter",
+            "Tool calls that raised or returned an error, by tool name.",
+            [({"tool": name}, count) for name, count in sorted(self._tool_errors.items())],
+        )
+        out.histogram("teamwork_tool_latency_seconds", "Tool call latency by tool name.", self._tool_latency)
+
+    def _collect_state(self, out):
+        in_flight = self.usage.in_flight()
+        out.metric(
+            "teamwork_calls_in_flight",
+            "gauge",
+            "LLM and tool calls started but not finished.",
+            [({"kind": kind}, sum(1 for call in in_flight if call["kind"] == kind)) for kind in ("llm", "tool")],
+        )
+        out.metric(
+            "teamwork_oldest_call_in_flight_seconds",
+            "gauge",
+            "Age of the oldest unfinished call.",
+            [({}, max((call["age"] for call in in_flight), default=0.0))],
+        )
+
+        if self.task_store is not None:
+            out.metric(
+                "teamwork_task_queue_depth",
+                "gauge",
+                "Pending tasks per TaskRepository role.",
+                [({"role": role}, count) for role, count in self.task_store.counts().items()],
+            )
+            out.metric("teamwork_tasks_archived_total", "counter", "Tasks completed during this run.", [({}, self.task_store.archived_count())])
+
+        if self.llm_cache is not None:
+            stats = self.llm_cache.stats()
+            out.metric(
+                "teamwork_llm_cache_lookups_total",
+                "counter",
+                "LLM cache lookups by result.",
+                [({"result": "hit"}, stats["hits"]), ({"result": "miss"}, stats["misses"])],
+            )
+            out.metric("teamwork_llm_cache_hit_ratio", "gauge", "LLM cache hit ratio.", [({}, stats["hit_ratio"])])
+            out.metric("teamwork_llm_cache_bytes", "gauge", "Size of the LLM cache.", [({}, stats["bytes"])])
+
+        memo = tool_memo.stats()
+        out.metric(
+            "teamwork_tool_memo_lookups_total",
+            "counter",
+            "Memoized tool lookups by tool name and result.",
+            [({"tool": name, "result": "hit"}, counts["hits"]) for name, counts in memo.items()]
+            + [({"tool": name, "result": "miss"}, counts["misses"]) for name, counts in memo.items()],
+        )
+        out.metric(
+            "teamwork_tool_memo_hit_ratio",
+            "gauge",
+            "Memoized tool hit ratio by tool name.",
+            [({"tool": name}, counts["hit_ratio"]) for name, counts in memo.items()],
+        )
+
+    def dump(self, path):
+        """Writes the metrics to a textfile, replaced atomically so a reader never sees half of it."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            f.write(self.collect())
+        os.replace(temp_path, path)
+        return path
+
+    async def _metrics(self, request):
+        return web.Response(
+            body=self.collect().encode(),
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+        )
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serves /metrics from a daemon thread, returns once the port is bound."""
+        ready = threading.Event()
+        errors = []
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            app = web.Application()
+            app.router.add_get("/metrics", self._metrics)
+            self._runner = web.AppRunner(app, access_log=None)
+            try:
+                self._loop.run_until_complete(self._runner.setup())
+                self._loop.run_until_complete(web.TCPSite(self._runner, host, port).start())
+            except OSError as e:
+                errors.append(e)
+                ready.set()
+                return
+            ready.set()
+            self._loop.run_forever()
+
+        threading.Thread(target=run, name="metrics-http", daemon=True).start()
+        ready.wait()
+        if errors:
+            raise errors[0]
+        return self
+
+    def dump_every(self, path, interval):
+        """Rewrites the textfile every `interval` seconds from a daemon thread, and once more on stop()."""
+        self._textfile = path
+
+        def run():
+            while not self._stop.wait(interval):
+                try:
+                    self.dump(path)
+                except OSError as e:
+                    print(f"Metrics dump to {path} failed: {e}")
+
+        threading.Thread(target=run, name="metrics-textfile", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._textfile:
+            self.dump(self._textfile)
+        if self._loop is not None:
+            asyncio.run_coroutine_threadsafe(self._runner.cleanup(), self._loop).result(timeout=5)
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+def start_metrics_from_env(usage, llm_cache=None):
+    """Starts the exporter when METRICS_PORT or METRICS_TEXTFILE is set, returns it or None."""
+    port = os.environ.get("METRICS_PORT")
+    textfile = os.environ.get("METRICS_TEXTFILE")
+    if not port and not textfile:
+        return None
+    from agents_v2 import TaskRepository
+
+    exporter = MetricsExporter(usage, llm_cache, TaskRepository.store)
+    if port:
+        exporter.serve(int(port), os.environ.get("METRICS_HOST", "127.0.0.1"))
+        print(f"Serving metrics on http://{os.environ.get('METRICS_HOST', '127.0.0.1')}:{port}/metrics")
+    if textfile:
+        exporter.dump_every(textfile, float(os.environ.get("METRICS_INTERVAL", 15)))
+    return exporter
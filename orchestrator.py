@@ -0,0 +1,169 @@
+import asyncio
+from crewai import Crew, Process, Task
+from accounting import usage_scope
+from prompt_layout import warmup
+from agents_v2 import TaskRepository, PlanningCrew, ExecutionCrew
+from tools.task_tools import TaskStatuses
+from tools.workspace import Workspace, current_workspace
+
+
+class PipelinedOrchestrator:
+    """Runs the planner, executor, reviewer and decider as concurrent asyncio stages.
+
+    Tasks queued in the TaskRepository, by the tools or by the orchestrator,
+    are pushed onto the queue of their role's stage as soon as they are added.
+    Each stage takes the ready tasks from its queue, marks them active and runs
+    them in a one-agent crew on a worker thread, then archives them. So the
+    executor starts on the first task while the planner is still queuing the
+    rest, and the planner can refine or clear upcoming work while the executor
+    runs: a task that is no longer queued when its stage reaches it is skipped.
+    A review waits only for the executor tasks that were queued before it, so
+    reviews of earlier work overlap with later execution.
+
+    The decider stage answers its yes/no questions with ExecutionCrew.decide()
+    instead of a crew. The run ends once every queue is empty and no stage is
+    busy.
+    """
+
+    ROLES = ("planner", "executor", "reviewer", "decider")
+
+    def __init__(self, batch_sizes=None, verbose=True):
+        # the executor takes one task at a time so reviews can start early
+        self.batch_sizes = {
+            "planner": None,
+            "executor": 1,
+            "reviewer": None,
+            "decider": None,
+            **(batch_sizes or {}),
+        }
+        self.verbose = verbose
+        self.agents = {
+            "planner": PlanningCrew.planner_agent,
+            "executor": ExecutionCrew.executor_agent,
+            "reviewer": ExecutionCrew.reviewer_agent,
+        }
+        self.results = []
+
+    def _on_task_added(self, record):
+        # called from whichever thread ran the tool, hand over to the loop
+        self._loop.call_soon_threadsafe(self._enqueue, record)
+
+    def _enqueue(self, record):
+        if record.role not in self._queues:
+            return
+        if record.role == "reviewer":
+            # review once the executor tasks queued so far have finished
+            self._after[record.id] = [
+                pending.id
+                for status in (TaskStatuses.TODO, TaskStatuses.ACTIVE)
+                for pending in TaskRepository.store.by_status(status)
+                if pending.role == "executor"
+            ]
+        self._outstanding += 1
+        self._idle.clear()
+        self._queues[record.role].put_nowait(record.id)
+
+    def _done(self, count):
+        self._outstanding -= count
+        if self._outstanding == 0:
+            self._idle.set()
+
+    async def _wait_for_executor(self, ids):
+        async with self._progress:
+            await self._progress.wait_for(
+                lambda: not any(TaskRepository.store.is_pending(task_id) for task_id in ids)
+            )
+
+    async def _decide(self, ids):
+        # one constrained completion per question, no agent loop
+        with usage_scope(stage="decider"):
+            verdicts = await asyncio.to_thread(ExecutionCrew.decide_tasks, ids)
+        if not verdicts:
+            return
+        result = "\n".join(f"- {description}: {verdict.decision} ({verdict.raw!r})" for description, verdict in verdicts)
+        self.results.append(("decider", result))
+        print("--------------------------------------------------")
+        print("Decider Verdicts:")
+        print(result)
+        print("--------------------------------------------------")
+
+    async def _stage(self, role):
+        queue = self._queues[role]
+        limit = self.batch_sizes.get(role)
+        iteration = 0
+        # every stage moves its own directory, change_directory in one agent does not move the others
+        with Workspace(current_workspace().cwd).activate():
+            while True:
+                ids = [await queue.get()]
+                while not queue.empty() and (limit is None or len(ids) < limit):
+                    ids.append(queue.get_nowait())
+                try:
+                    for task_id in ids:
+                        await self._wait_for_executor(self._after.pop(task_id, ()))
+                    if role == "decider":
+                        await self._decide(ids)
+                        continue
+                    tasks = TaskRepository.start_tasks(role, ids)
+                    if not tasks:
+                        # cleared or replaced while it was waiting in the queue
+                        continue
+                    iteration += 1
+                    crew = Crew(
+                        agents=[self.agents[role]()],
+                        process=Process.sequential,
+                        tasks=tasks,
+                        verbose=self.verbose,
+                    )
+                    with usage_scope(stage=role, iteration=iteration):
+                        result = await asyncio.to_thread(crew.kickoff)
+                    TaskRepository.complete_tasks(role, result, ids)
+                    self.results.append((role, result))
+                    print("--------------------------------------------------")
+                    print(f"{role.capitalize()} stage result ({len(tasks)} tasks):")
+                    print(result)
+                    print("--------------------------------------------------")
+                finally:
+                    for _ in ids:
+                        queue.task_done()
+                    async with self._progress:
+                        self._progress.notify_all()
+                    self._done(len(ids))
+
+    async def run(self, objective_task=None):
+        """Queues the initial planner task and runs the stages until all work is done."""
+        self._loop = asyncio.get_running_loop()
+        self._queues = {role: asyncio.Queue() for role in self.ROLES}
+        self._after = {}
+        self._outstanding = 0
+        self._idle = asyncio.Event()
+        self._progress = asyncio.Condition()
+        TaskRepository.start_run()
+        TaskRepository.subscribe(self._on_task_added)
+        # evaluate the static prompt prefixes before the stages start
+        await asyncio.to_thread(warmup, [factory() for factory in self.agents.values()])
+        stages = [asyncio.create_task(self._stage(role)) for role in self.ROLES]
+        try:
+            # tasks queued before the run, then the objective for the planner
+            for record in TaskRepository.store.by_status(TaskStatuses.TODO):
+                self._enqueue(record)
+            TaskRepository.add_task(
+                "planner",
+                objective_task
+                or Task(
+                    description="Achieve the objective by breaking it down into small, actionable tasks that can be carried out by other agents.",
+                    agent=PlanningCrew.planner_agent(),
+                ),
+            )
+            idle = asyncio.create_task(self._idle.wait())
+            await asyncio.wait([idle, *stages], return_when=asyncio.FIRST_COMPLETED)
+            idle.cancel()
+            for stage in stages:
+                # a stage only finishes early when its crew raised
+                if stage.done():
+                    stage.result()
+        finally:
+            TaskRepository.unsubscribe(self._on_task_added)
+            for stage in stages:
+                stage.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+        return self.results
@@ -0,0 +1,90 @@
+import os
+from crewai.utilities import I18N
+from langchain.tools.render import render_text_description
+from accounting import usage_scope
+
+# "prefix", the default, puts the parts of the agent prompt that never change first, so a
+# llama.cpp backend can reuse the KV cache of the shared prefix, "crewai"
+# keeps crewAI's own layout
+PROMPT_LAYOUT = os.environ.get("PROMPT_LAYOUT", "prefix")
+PROMPT_WARMUP = os.environ.get("PROMPT_WARMUP", "0") == "1"
+
+# the tool-use instructions are the same for every agent, so they go first
+FORMAT_INSTRUCTIONS = """\
+To use a tool, please use the exact following format:
+
+```
+Thought: Do I need to use a tool? Yes
+Action: the action to take, should be one of the tool names listed under TOOLS, just the name.
+Action Input: the input to the action
+Observation: the result of the action
+```
+
+When you have a response for your task, or if you do not need to use a tool, you MUST use the format:
+
+```
+Thought: Do I need to use a tool? No
+Final Answer: [your response here]
+```
+
+"""
+
+PREFIX_SLICES = {
+    "role_playing": FORMAT_INSTRUCTIONS + "You are {role}.\n{backstory}\n\nYour personal goal is: {goal}\n\n",
+    "tools": "TOOLS:\n------\nYou have access to only the following tools:\n\n{tools}\n\nTool names: [{tool_names}]\n\n",
+}
+
+
+class PrefixStableI18N(I18N):
+    """crewAI translations with the prefix-stable slices.
+
+    The prompt becomes: tool-use instructions, role, backstory and goal, the
+    tool list (sorted, see tools.toolset), then the volatile parts: memory
+    summary, current task and scratchpad.
+    """
+
+    def retrieve(self, kind, key):
+        if kind == "slices" and key in PREFIX_SLICES:
+            return PREFIX_SLICES[key]
+        return super().retrieve(kind, key)
+
+
+_i18n = {}
+
+
+def prompt_i18n():
+    """Returns the crewAI translations for the configured prompt layout, shared by every agent."""
+    i18n = _i18n.get(PROMPT_LAYOUT)
+    if i18n is None:
+        i18n = PrefixStableI18N() if PROMPT_LAYOUT == "prefix" else I18N()
+        _i18n[PROMPT_LAYOUT] = i18n
+    return i18n
+
+
+def static_prefix(agent):
+    """Returns the part of an agent's prompt that is the same on every call."""
+    i18n = agent.i18n
+    template = i18n.slice("role_playing") + i18n.slice("tools")
+    return template.format(
+        role=agent.role,
+        backstory=agent.backstory,
+        goal=agent.goal,
+        tools=render_text_description(agent.tools),
+        tool_names=", ".join(tool.name.strip() for tool in agent.tools),
+    )
+
+
+def warmup(agents):
+    """Evaluates each agent's static prompt prefix with a one-token completion.
+
+    Enabled with PROMPT_WARMUP=1. Agents are warmed in reverse order, so the
+    first agent to run is the one whose prefix is left in a single-slot cache.
+    """
+    if not PROMPT_WARMUP:
+        return
+    with usage_scope(warmup=True):
+        for agent in reversed(agents):
+            try:
+                agent.llm.bind(max_tokens=1).invoke(static_prefix(agent))
+            except Exception as e:
+                print(f"Warmup failed for {agent.role}: {e}")
@@ -0,0 +1,187 @@
+import os
+import re
+import threading
+import zlib
+import numpy as np
+
+# tasks for these roles are not queued twice in a run when a new one has the
+# same action and files as a pending or completed one and its shingle vector's
+# cosine similarity is at or above the threshold, TASK_DEDUP=0 turns it off
+TASK_DEDUP = os.environ.get("TASK_DEDUP", "1") == "1"
+TASK_DEDUP_THRESHOLD = float(os.environ.get("TASK_DEDUP_THRESHOLD", 0.85))
+TASK_DEDUP_ROLES = os.environ.get("TASK_DEDUP_ROLES", "executor")
+
+DIMENSIONS = 4096
+SHINGLE_SIZE = 4
+
+# file names, paths, identifiers and quoted text, "create hello.txt" and
+# "create world.txt" read alike but are different tasks
+ANCHOR_PATTERN = re.compile(
+    r"""(?<!\w)['"`]([^'"`\n]+)['"`](?!\w)|([\w-]*[./_\d][\w./-]*\w)"""
+)
+
+# words that do not change what a task asks for
+STOP_WORDS = frozenset(
+    "a an the to of for in on at with and into from by as is be it its this that named called please"
+    " all every each any".split()
+)
+
+
+def dedup_role(role):
+    """Returns True if pending tasks for the role are checked for near-duplicates."""
+    roles = {name.strip().lower() for name in TASK_DEDUP_ROLES.split(",")}
+    return str(role).lower() in roles
+
+
+def content_words(text):
+    """Returns the lowercased words of a description without stop words, punctuation and plural s."""
+    words = []
+    for word in re.findall(r"[a-z0-9_./-]+", text.lower()):
+        word = word.strip("./-")
+        if not word or word in STOP_WORDS:
+            continue
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss") and "." not in word:
+            word = word[:-1]
+        words.append(word)
+    return words
+
+
+def shingle_vector(text, dimensions=DIMENSIONS, size=SHINGLE_SIZE):
+    """Returns the L2-normalized hashed character shingle counts of a description.
+
+    Case, punctuation, whitespace, plurals and stop words are ignored, so
+    "list all files" and "list every file" land on the same vector. Hashing into a fixed
+    number of buckets keeps vectors comparable as tasks are added, unlike
+    TF-IDF weights, which shift with every new document.
+    """
+    normalized = f" {' '.join(content_words(text))} "
+    vector = np.zeros(dimensions, dtype=np.float32)
+    if len(normalized) < size:
+        return vector
+    buckets = [
+        zlib.crc32(normalized[i : i + size].encode()) % dimensions
+        for i in range(len(normalized) - size + 1)
+    ]
+    np.add.at(vector, buckets, 1.0)
+    # sublinear counts so a repeated phrase does not dominate
+    np.log1p(vector, out=vector)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector
+
+
+def anchors(text):
+    """Returns the file names, identifiers and quoted strings in a description."""
+    return frozenset(
+        (quoted or word).lower() for quoted, word in ANCHOR_PATTERN.findall(text)
+    )
+
+
+def signature(text):
+    """Returns what two descriptions must share before their similarity counts.
+
+    The leading action verb, so "create hello.txt" is not "delete hello.txt",
+    and the anchors, so "create hello.txt" is not "create world.txt".
+    """
+    words = content_words(text)
+    return words[0] if words else "", anchors(text)
+
+
+class TaskIndex:
+    """Near-duplicate lookup over task descriptions.
+
+    Vectors live in one preallocated matrix that doubles when full, so a
+    lookup is a single matrix-vector product over every indexed task. Tasks
+    are compared within a scope, e.g. a role, and stay indexed once completed
+    until the index is cleared for a new run. A similar task only counts as
+    a duplicate if it has the same action verb, files and quoted text.
+    """
+
+    def __init__(self, threshold=None, enabled=None, capacity=64):
+        self.threshold = TASK_DEDUP_THRESHOLD if threshold is None else threshold
+        self.enabled = TASK_DEDUP if enabled is None else enabled
+        self._matrix = np.zeros((capacity, DIMENSIONS), dtype=np.float32)
+        self._ids = []
+        self._scopes = []
+        self._descriptions = []
+        self._signatures = []
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, task_id):
+        return task_id in self._rows
+
+    def match(self, description, scope=None):
+        """Returns (task_id, description, similarity) of the closest task in the scope at or above the threshold, or None."""
+        if not self.enabled:
+            return None
+        vector = shingle_vector(description)
+        with self._lock:
+            count = len(self._ids)
+            if not count:
+                return None
+            scores = self._matrix[:count] @ vector
+            if scope is not None:
+                scores[np.asarray(self._scopes) != scope] = -1.0
+            candidates = np.flatnonzero(scores >= self.threshold)
+            if not len(candidates):
+                return None
+            key = signature(description)
+            for row in candidates[np.argsort(-scores[candidates])]:
+                if self._signatures[row] == key:
+                    return self._ids[row], self._descriptions[row], float(scores[row])
+            return None
+
+    def add(self, task_id, description, scope=None):
+        """Indexes a task, a known id is left as it is."""
+        if not self.enabled:
+            return
+        vector = shingle_vector(description)
+        with self._lock:
+            if task_id in self._rows:
+                return
+            row = len(self._ids)
+            if row == len(self._matrix):
+                grown = np.zeros((row * 2, DIMENSIONS), dtype=np.float32)
+                grown[:row] = self._matrix
+                self._matrix = grown
+            self._matrix[row] = vector
+            self._ids.append(task_id)
+            self._scopes.append(scope)
+            self._descriptions.append(description)
+            self._signatures.append(signature(description))
+            self._rows[task_id] = row
+
+    def remove(self, task_id):
+        """Drops a task that was discarded without being done."""
+        with self._lock:
+            row = self._rows.pop(task_id, None)
+            if row is None:
+                return
+            last = len(self._ids) - 1
+            if row != last:
+                # move the last task into the freed row
+                self._matrix[row] = self._matrix[last]
+                self._ids[row] = self._ids[last]
+                self._scopes[row] = self._scopes[last]
+                self._descriptions[row] = self._descriptions[last]
+                self._signatures[row] = self._signatures[last]
+                self._rows[self._ids[row]] = row
+            self._matrix[last] = 0.0
+            self._ids.pop()
+            self._scopes.pop()
+            self._descriptions.pop()
+            self._signatures.pop()
+
+    def clear(self):
+        with self._lock:
+            self._matrix[: len(self._ids)] = 0.0
+            self._ids.clear()
+            self._scopes.clear()
+            self._descriptions.clear()
+            self._signatures.clear()
+            self._rows.clear()
@@ -0,0 +1,149 @@
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+
+class AmbiguousTaskId(ValueError):
+    """Raised when a task id prefix matches more than one task."""
+
+
+class TaskLedger:
+    """Transactional task ledger stored in sqlite.
+
+    The database runs in WAL mode so several agent processes can read while one
+    writes, writers take an immediate lock and wait on `busy_timeout` instead of
+    failing. Each thread gets its own connection.
+    """
+
+    def __init__(self, path, busy_timeout_ms=30000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS tasks (
+                    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                    id TEXT NOT NULL UNIQUE,
+                    status TEXT NOT NULL,
+                    description TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, seq)")
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.path, timeout=self.busy_timeout_ms / 1000, isolation_level=None
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """Runs a write transaction holding the database write lock."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def add(self, task_id, description, status):
+        """Adds a task, returns False if a task with the same id already exists."""
+        now = time.time()
+        with self._transaction() as conn:
+            cursor = conn.execute(
+                "INSERT OR IGNORE INTO tasks (id, status, description, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (task_id, status, description, now, now),
+            )
+            return cursor.rowcount == 1
+
+    def get(self, task_id):
+        """Returns the task with the exact id, or None."""
+        row = self._connection().execute(
+            "SELECT id, status, description FROM tasks WHERE id = ?", (task_id,)
+        ).fetchone()
+        return dict(row) if row else None
+
+    def read(self, status=None):
+        """Returns tasks in insertion order, optionally filtered by status."""
+        conn = self._connection()
+        if status:
+            rows = conn.execute(
+                "SELECT id, status, description FROM tasks WHERE status = ? ORDER BY seq",
+                (status,),
+            )
+        else:
+            rows = conn.execute("SELECT id, status, description FROM tasks ORDER BY seq")
+        return [dict(row) for row in rows]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+
+    def resolve_id(self, task_id, conn=None):
+        """Resolves an exact id or a unique id prefix to the full id via the id index."""
+        if not task_id:
+            return None
+        conn = conn or self._connection()
+        row = conn.execute("SELECT id FROM tasks WHERE id = ?", (task_id,)).fetchone()
+        if row:
+            return row[0]
+        rows = conn.execute(
+            "SELECT id FROM tasks WHERE id >= ? AND id < ? LIMIT 2",
+            (task_id, task_id + "\uffff"),
+        ).fetchall()
+        if len(rows) > 1:
+            raise AmbiguousTaskId(f"Task id prefix '{task_id}' matches several tasks")
+        return rows[0][0] if rows else None
+
+    def update_status(self, task_id, status):
+        """Updates one task's status, returns the full id or None if not found."""
+        with self._transaction() as conn:
+            full_id = self.resolve_id(task_id, conn)
+            if full_id is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET status = ?, updated = ? WHERE id = ?",
+                (status, time.time(), full_id),
+            )
+            return full_id
+
+    def import_markdown(self, path):
+        """Imports tasks from a legacy tasks.md file, returns the number imported."""
+        if not os.path.exists(path):
+            return 0
+        imported = 0
+        with open(path, "r") as file:
+            for line in file:
+                if not line.startswith("- ["):
+                    continue
+                status, _, task_content = line.strip().partition("] ")
+                task_id, _, description = task_content.partition(": ")
+                if task_id and self.add(task_id, description, status[3:]):
+                    imported += 1
+        return imported
+
+    def export_markdown(self, path):
+        """Writes the ledger to a markdown file in the legacy tasks.md format."""
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as file:
+            for task in self.read():
+                file.write(f"- [{task['status']}] {task['id']}: {task['description']}\n")
+        os.replace(temp_path, path)
+        return path
@@ -0,0 +1,293 @@
+import hashlib
+import json
+import os
+import threading
+from task_dedup import TaskIndex, dedup_role
+from tools.task_tools import TaskStatuses
+
+
+class TaskRecord:
+    """Compact record of a task held by the TaskStore."""
+
+    __slots__ = ("id", "role", "status", "description", "task")
+
+    def __init__(self, task_id, role, status, description, task=None):
+        self.id = task_id
+        self.role = role
+        self.status = status
+        self.description = description
+        self.task = task
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "role": self.role,
+            "status": self.status,
+            "description": self.description,
+        }
+
+
+class RoleTaskList:
+    """List-like view of the pending tasks for one role.
+
+    Keeps `TaskRepository.<role>_tasks.append(...)`, `.clear()`, iteration and
+    truthiness working on top of the store. Iteration walks a snapshot, so the
+    view can be mutated while it is being iterated.
+    """
+
+    def __init__(self, store, role):
+        self._store = store
+        self._role = role
+
+    def append(self, task):
+        """Queues a task, returns False and says why if an existing task already covers it."""
+        record, created = self._store.add(self._role, task)
+        if not created:
+            print(f"Task not queued for the {self._role}, {record.id[:12]} ({record.status}) already covers it: {record.description}")
+        return created
+
+    def extend(self, tasks):
+        for task in tasks:
+            self.append(task)
+
+    def clear(self):
+        self._store.discard(self._role)
+
+    def __iter__(self):
+        return iter(self._store.snapshot(self._role))
+
+    def __len__(self):
+        return self._store.count(self._role)
+
+    def __bool__(self):
+        return self._store.count(self._role) > 0
+
+    def __getitem__(self, index):
+        return self._store.snapshot(self._role)[index]
+
+    def __repr__(self):
+        return f"RoleTaskList({self._role!r}, {len(self)} pending)"
+
+
+class TaskStore:
+    """In-memory task store indexed by role, status and content-hash id.
+
+    Pending tasks keep their `Task` objects, completed tasks are written to a
+    JSONL archive and only their file offset is kept in memory. Tasks of the
+    TASK_DEDUP_ROLES are indexed to catch near-duplicates of pending and
+    completed tasks of the same run, see start_run().
+    """
+
+    def __init__(self, roles=(), archive_path=None, index=None):
+        self.archive_path = archive_path
+        self.index = index or TaskIndex()
+        self._records = {}
+        self._by_role = {}
+        self._by_status = {status: {} for status in TaskStatuses.STATUS_DESCRIPTIONS}
+        self._archive = {}
+        self._archive_file = None
+        self._snapshots = {}
+        self._listeners = []
+        self._lock = threading.RLock()
+        # bumped on every change, memoized task tools compare it
+        self.version = 0
+        for role in roles:
+            self._by_role[role] = {}
+
+    @staticmethod
+    def task_id(role, description):
+        """Generates a content-hash id for a task description within a role."""
+        return hashlib.sha256(f"{role}:{description}".encode()).hexdigest()
+
+    def roles(self):
+        """Returns the known roles in registration order."""
+        return list(self._by_role)
+
+    def subscribe(self, listener):
+        """Calls listener(record) for every newly queued task, from the thread that added it."""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def view(self, role):
+        """Returns a list-like view of the pending tasks for a known role."""
+        with self._lock:
+            if role not in self._by_role:
+                raise KeyError(f"Unknown role {role}, expected one of {', '.join(self._by_role)}")
+        return RoleTaskList(self, role)
+
+    def start_run(self):
+        """Forgets the tasks indexed for near-duplicates, so a new run can queue them again."""
+        self.index.clear()
+
+    def add(self, role, task, status=TaskStatuses.TODO):
+        """Adds a task for the role, returns (record, created).
+
+        An identical pending task for the same role is not queued twice, and
+        for the TASK_DEDUP_ROLES neither is one near-identical to a task
+        queued in this run, pending or completed, the existing record is
+        returned instead.
+        """
+        description = task.description
+        task_id = self.task_id(role, description)
+        dedup = dedup_role(role)
+        with self._lock:
+            existing = self._records.get(task_id)
+            if existing is not None:
+                return existing, False
+            match = self.index.match(description, scope=role) if dedup else None
+            if match is not None:
+                return self._existing(match[0], role, match[1]), False
+            record = TaskRecord(task_id, role, status, description, task)
+            if dedup:
+                self.index.add(task_id, description, scope=role)
+            self._records[task_id] = record
+            self._by_role.setdefault(role, {})[task_id] = None
+            self._by_status[status][task_id] = None
+            self._snapshots.pop(role, None)
+            self.version += 1
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener(record)
+        return record, True
+
+    def _existing(self, task_id, role, description):
+        record = self._records.get(task_id)
+        if record is not None:
+            return record
+        # completed, the archive only has a dict
+        return TaskRecord(task_id, role, TaskStatuses.DONE, description)
+
+    def get(self, task_id):
+        """Returns the record for a pending task or the archived dict for a completed one."""
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is not None:
+                return record
+            offset = self._archive.get(task_id)
+            if offset is None:
+                return None
+            self._archive_file.flush()
+            with open(self.archive_path, "r") as file:
+                file.seek(offset)
+                return json.loads(file.readline())
+
+    def is_pending(self, task_id):
+        """Returns True while a task is queued or active."""
+        with self._lock:
+            return task_id in self._records
+
+    def count(self, role=None):
+        """Returns the number of pending tasks for the role, or for all roles."""
+        with self._lock:
+            if role is None:
+                return len(self._records)
+            return len(self._by_role.get(role, ()))
+
+    def counts(self):
+        """Returns the number of pending tasks per role."""
+        with self._lock:
+            return {role: len(ids) for role, ids in self._by_role.items()}
+
+    def snapshot(self, role):
+        """Returns a tuple of the pending Task objects for the role.
+
+        The tuple is cached until the role's tasks change, so repeated
+        iteration is cheap.
+        """
+        with self._lock:
+            snapshot = self._snapshots.get(role)
+            if snapshot is None:
+                ids = self._by_role.get(role, ())
+                snapshot = tuple(self._records[task_id].task for task_id in ids)
+                self._snapshots[role] = snapshot
+            return snapshot
+
+    def by_status(self, status):
+        """Returns the pending records with the given status."""
+        with self._lock:
+            return [self._records[task_id] for task_id in self._by_status[status]]
+
+    def set_status(self, task_id, status):
+        """Moves a pending task to a new status."""
+        with self._lock:
+            record = self._records[task_id]
+            del self._by_status[record.status][task_id]
+            record.status = status
+            self._by_status[status][task_id] = None
+            self.version += 1
+
+    def start(self, role, ids=None):
+        """Marks the queued tasks for the role (or only the given ids) ACTIVE and returns them."""
+        with self._lock:
+            if ids is None:
+                for task_id in self._by_role.get(role, ()):
+                    if self._records[task_id].status == TaskStatuses.TODO:
+                        self.set_status(task_id, TaskStatuses.ACTIVE)
+                return list(self.snapshot(role))
+            tasks = []
+            for task_id in ids:
+                record = self._records.get(task_id)
+                if record is not None and record.status == TaskStatuses.TODO:
+                    self.set_status(task_id, TaskStatuses.ACTIVE)
+                    tasks.append(record.task)
+            return tasks
+
+    def complete(self, role, result=None, ids=None):
+        """Archives the ACTIVE tasks for the role, or only the given ids, returns how many.
+
+        Tasks queued while the crew ran were never started and stay pending.
+        """
+        with self._lock:
+            if ids is not None:
+                ids = [task_id for task_id in ids if task_id in self._records]
+            else:
+                ids = [
+                    task_id
+                    for task_id in self._by_role.get(role, ())
+                    if self._records[task_id].status == TaskStatuses.ACTIVE
+                ]
+            for task_id in ids:
+                record = self._remove(task_id)
+                self._write_archive(record, result)
+            return len(ids)
+
+    def discard(self, role=None):
+        """Drops pending tasks for the role (or all roles) without archiving them."""
+        with self._lock:
+            roles = [role] if role is not None else list(self._by_role)
+            for name in roles:
+                for task_id in list(self._by_role.get(name, ())):
+                    self._remove(task_id)
+                    self.index.remove(task_id)
+
+    def _remove(self, task_id):
+        record = self._records.pop(task_id)
+        del self._by_role[record.role][task_id]
+        del self._by_status[record.status][task_id]
+        self._snapshots.pop(record.role, None)
+        self.version += 1
+        return record
+
+    def _write_archive(self, record, result):
+        output = getattr(record.task, "output", None)
+        entry = record.as_dict()
+        entry["status"] = TaskStatuses.DONE
+        entry["output"] = str(getattr(output, "result", output or result or ""))
+        if self.archive_path is None:
+            return
+        if self._archive_file is None:
+            directory = os.path.dirname(self.archive_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._archive_file = open(self.archive_path, "w")
+        self._archive[record.id] = self._archive_file.tell()
+        self._archive_file.write(json.dumps(entry) + "\n")
+
+    def archived_count(self):
+        """Returns the number of tasks archived during this run."""
+        return len(self._archive)
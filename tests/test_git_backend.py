@@ -0,0 +1,66 @@
+import os
+import subprocess
+import tempfile
+import unittest
+from tools.git_backend import GitBackend
+from tools.git_tools import GitTools
+from tools.memo import tool_memo
+from tools.workspace import Workspace
+
+
+def _git(root, *args):
+    subprocess.run(["git", *args], cwd=root, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class GitBackendTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.directory.name)
+        _git(self.root, "init", "-q")
+        for name, content in (("a.txt", "alpha\n"), ("b.txt", "bravo\n")):
+            with open(os.path.join(self.root, name), "w") as f:
+                f.write(content)
+        _git(self.root, "add", "a.txt", "b.txt")
+        _git(self.root, "-c", "user.name=test", "-c", "user.email=test@example.com", "commit", "-q", "-m", "init")
+        self.backend = GitBackend.for_directory(self.root)
+        tool_memo.reset()
+
+    def tearDown(self):
+        self.backend.close()
+        self.directory.cleanup()
+
+    def test_missing_object_keeps_the_process(self):
+        self.assertIsNotNone(self.backend.check("HEAD:a.txt"))
+        process = self.backend._batches["--batch-check"]
+        self.assertIsNone(self.backend.check("HEAD:nope.txt"))
+        self.assertIs(self.backend._batches["--batch-check"], process)
+
+    def test_multiline_spec_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.backend.cat_file("HEAD:a.txt\nHEAD:b.txt")
+        self.assertEqual(self.backend.cat_file("HEAD:a.txt")[3], b"alpha\n")
+
+    def test_dead_process_is_restarted(self):
+        self.backend.check("HEAD:a.txt")
+        process = self.backend._batches["--batch-check"]
+        process.kill()
+        process.wait()
+        self.assertEqual(self.backend.check("HEAD:b.txt")[1], "blob")
+
+    def test_git_show_file_does_not_desync(self):
+        with Workspace(self.root).activate():
+            result = GitTools.git_show_file.func("HEAD:a.txt\nHEAD:b.txt")
+            self.assertIn("single line", result)
+            self.assertEqual(GitTools.git_show_file.func("HEAD:a.txt"), "alpha")
+            self.assertEqual(GitTools.git_show_file.func("HEAD:b.txt"), "bravo")
+
+    def test_git_log_rejects_negative_counts(self):
+        with Workspace(self.root).activate():
+            for options in ("n=-3", "-3", "skip=-1", "n=0"):
+                with self.subTest(options=options):
+                    self.assertIn("Validation Error", GitTools.git_log.func(options))
+            self.assertIn("init", GitTools.git_log.func("n=1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+from task_dedup import TaskIndex
+from task_store import TaskStore
+from tools.task_tools import TaskStatuses
+
+
+class FakeTask:
+    def __init__(self, description):
+        self.description = description
+
+
+PARAPHRASES = [
+    (
+        "Create README.md listing every file in the directory",
+        "Create a README.md file listing all the files in the directory",
+    ),
+    ("List all files in the current directory", "List every file in the current directory"),
+    ("Add a section on installation to README.md", "Add an installation section to README.md"),
+    ("Fix the failing test in test_api.py", "Fix the failing tests in test_api.py"),
+    ("Write unit tests for the parser module", "Write the unit tests for the parser"),
+]
+
+DIFFERENT = [
+    ("Create the file hello.txt", "Delete the file hello.txt"),
+    ("Create the file hello.txt", "Create the file world.txt"),
+    ("Write unit tests for the parser", "Write unit tests for the lexer"),
+    ("Fix the failing test in test_api.py", "Verify the failing test in test_api.py"),
+    ("Update README with install steps", "Update README with usage steps"),
+]
+
+
+class TaskIndexTest(unittest.TestCase):
+    def test_paraphrases_match(self):
+        for first, second in PARAPHRASES:
+            with self.subTest(first=first, second=second):
+                index = TaskIndex(enabled=True)
+                index.add("first", first, scope="executor")
+                match = index.match(second, scope="executor")
+                self.assertIsNotNone(match)
+                self.assertEqual(match[0], "first")
+
+    def test_different_tasks_do_not_match(self):
+        for first, second in DIFFERENT:
+            with self.subTest(first=first, second=second):
+                index = TaskIndex(enabled=True)
+                index.add("first", first, scope="executor")
+                self.assertIsNone(index.match(second, scope="executor"))
+
+    def test_scopes_are_separate(self):
+        index = TaskIndex(enabled=True)
+        index.add("first", PARAPHRASES[0][0], scope="executor")
+        self.assertIsNone(index.match(PARAPHRASES[0][1], scope="reviewer"))
+
+    def test_grows_past_capacity(self):
+        index = TaskIndex(enabled=True, capacity=2)
+        for number in range(5):
+            index.add(number, f"Create the file file_{number}.txt", scope="executor")
+        self.assertEqual(len(index), 5)
+        self.assertEqual(index.match("Create a file file_4.txt", scope="executor")[0], 4)
+
+
+class TaskStoreDedupTest(unittest.TestCase):
+    def setUp(self):
+        self.store = TaskStore(roles=("planner", "executor"), index=TaskIndex(enabled=True))
+
+    def test_paraphrase_of_pending_task_is_not_queued(self):
+        first, second = PARAPHRASES[0]
+        record, created = self.store.add("executor", FakeTask(first))
+        self.assertTrue(created)
+        existing, created = self.store.add("executor", FakeTask(second))
+        self.assertFalse(created)
+        self.assertEqual(existing.id, record.id)
+        self.assertEqual(self.store.count("executor"), 1)
+
+    def test_paraphrase_of_completed_task_is_not_queued(self):
+        first, second = PARAPHRASES[1]
+        record, _ = self.store.add("executor", FakeTask(first))
+        self.store.start("executor")
+        self.store.complete("executor")
+        existing, created = self.store.add("executor", FakeTask(second))
+        self.assertFalse(created)
+        self.assertEqual(existing.id, record.id)
+        self.assertEqual(existing.status, TaskStatuses.DONE)
+
+    def test_new_run_queues_it_again(self):
+        first, second = PARAPHRASES[1]
+        self.store.add("executor", FakeTask(first))
+        self.store.start("executor")
+        self.store.complete("executor")
+        self.store.start_run()
+        _, created = self.store.add("executor", FakeTask(second))
+        self.assertTrue(created)
+
+    def test_planner_tasks_are_not_deduplicated(self):
+        first, second = PARAPHRASES[0]
+        self.store.add("planner", FakeTask(first))
+        _, created = self.store.add("planner", FakeTask(second))
+        self.assertTrue(created)
+
+
+if __name__ == "__main__":
+    unittest.main()
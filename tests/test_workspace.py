@@ -0,0 +1,54 @@
+import os
+import tempfile
+import threading
+import unittest
+from contextvars import copy_context
+from tools.file_tools import FileTools
+from tools.workspace import Workspace, current_workspace
+
+
+class ChangeDirectoryTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.root = os.path.realpath(self.directory.name)
+        for name in ("one", "two"):
+            os.mkdir(os.path.join(self.root, name))
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_active_workspace_moves(self):
+        workspace = Workspace(self.root)
+        with workspace.activate():
+            FileTools.change_directory.func("one")
+        self.assertEqual(workspace.cwd, os.path.join(self.root, "one"))
+
+    def test_shared_default_is_left_alone(self):
+        default = current_workspace().cwd
+        process_cwd = os.getcwd()
+        context = copy_context()
+        context.run(FileTools.change_directory.func, self.root)
+        self.assertEqual(context.run(lambda: current_workspace().cwd), self.root)
+        self.assertEqual(current_workspace().cwd, default)
+        self.assertEqual(os.getcwd(), process_cwd)
+
+    def test_threads_do_not_share_a_directory(self):
+        seen = {}
+
+        def agent(name):
+            def run():
+                FileTools.change_directory.func(os.path.join(self.root, name))
+                seen[name] = current_workspace().cwd
+
+            copy_context().run(run)
+
+        threads = [threading.Thread(target=agent, args=(name,)) for name in ("one", "two")]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(seen, {name: os.path.join(self.root, name) for name in ("one", "two")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+import importlib
+import sys
+import threading
+import time
+
+# tool classes by name, imported on first use
+TOOL_CLASSES = {
+    "FileTools": "tools.file_tools",
+    "GitTools": "tools.git_tools",
+    "SearchTools": "tools.search_tools",
+    "TaskStatuses": "tools.task_tools",
+    "TaskRepositoryTools": "tools.task_tools",
+    "CrewTaskTools": "tools.task_tools",
+    "TaskManagerTools": "tools.task_tools",
+    "ObservationTools": "tools.observation_guard",
+}
+
+
+def _wikipedia():
+    from langchain_community.tools import WikipediaQueryRun
+    from langchain_community.utilities import WikipediaAPIWrapper
+
+    return WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
+
+
+def _duckduckgo_search():
+    from langchain_community.tools import DuckDuckGoSearchRun
+
+    return DuckDuckGoSearchRun()
+
+
+# network-backed tools: (name, description, factory), built on their first call
+TOOL_FACTORIES = {
+    "wikipedia": (
+        "wikipedia",
+        "A wrapper around Wikipedia. Useful for when you need to answer general questions about people, places, companies, facts, historical events, or other subjects. Input should be a search query.",
+        _wikipedia,
+    ),
+    "duckduckgo_search": (
+        "duckduckgo_search",
+        "A wrapper around DuckDuckGo Search. Useful for when you need to answer questions about current events. Input should be a search query.",
+        _duckduckgo_search,
+    ),
+}
+
+_lock = threading.RLock()
+_lazy_tools = {}
+
+# seconds spent importing each tool module, including what it imported first
+import_times = {}
+
+
+def _import(module_name):
+    module = sys.modules.get(module_name)
+    if module is not None:
+        return module
+    with _lock:
+        started = time.perf_counter()
+        module = importlib.import_module(module_name)
+        import_times.setdefault(module_name, time.perf_counter() - started)
+        return module
+
+
+def tool_class(name):
+    """Returns a tool class by name, importing its module on first use."""
+    module_name = TOOL_CLASSES.get(name)
+    if module_name is None:
+        raise KeyError(f"Unknown tool class {name}, expected one of {', '.join(TOOL_CLASSES)}")
+    return getattr(_import(module_name), name)
+
+
+def get_tool(name):
+    """Returns a tool by 'Class.tool' name, e.g. 'FileTools.read_file', or a network-backed tool by name.
+
+    Network-backed tools are returned as a LazyTool that builds the real tool,
+    and imports its dependencies, on the first call.
+    """
+    if name in TOOL_FACTORIES:
+        with _lock:
+            lazy = _lazy_tools.get(name)
+            if lazy is None:
+                from tools.lazy_tool import LazyTool
+
+                tool_name, description, factory = TOOL_FACTORIES[name]
+                lazy = LazyTool(name=tool_name, description=description, factory=factory)
+                _lazy_tools[name] = lazy
+            return lazy
+    class_name, _, tool_name = name.partition(".")
+    return getattr(tool_class(class_name), tool_name)
+
+
+def get_tools(*names):
+    """Returns the tools for several names, see get_tool."""
+    return [get_tool(name) for name in names]
+
+
+def print_import_stats():
+    """Prints the import time of every tool module and the build time of every lazy tool loaded through the registry."""
+    timings = dict(import_times)
+    for name, lazy in _lazy_tools.items():
+        if lazy.tool is not None:
+            timings[f"{name} (built)"] = lazy.build_seconds
+    if not timings:
+        return
+    print("--------------------------------------------------")
+    print("Tool imports:")
+    for name, seconds in sorted(timings.items(), key=lambda item: -item[1]):
+        print(f"- {name}: {seconds * 1000:.0f} ms")
+    print("--------------------------------------------------")
+
+
+def __getattr__(name):
+    # `from tools.all_tools import FileTools` imports tools.file_tools only then
+    if name in TOOL_CLASSES:
+        return tool_class(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,145 @@
+import fnmatch
+import os
+import threading
+
+
+class IgnoreRules:
+    """Patterns from one .gitignore file, matched relative to its directory."""
+
+    def __init__(self, base, lines):
+        self.base = base
+        self.rules = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.strip("/") if dir_only else line
+            anchored = line.startswith("/") or "/" in line
+            self.rules.append((line.lstrip("/"), negate, dir_only, anchored))
+
+    @classmethod
+    def load(cls, directory):
+        path = os.path.join(directory, ".gitignore")
+        try:
+            with open(path, "r") as f:
+                return cls(directory, f.readlines())
+        except OSError:
+            return None
+
+    def match(self, path, is_dir):
+        """Returns True/False if a rule decides the path, None otherwise."""
+        relative = os.path.relpath(path, self.base).replace(os.sep, "/")
+        name = relative.rsplit("/", 1)[-1]
+        decision = None
+        for pattern, negate, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            target = relative if anchored else name
+            if fnmatch.fnmatchcase(target, pattern):
+                decision = not negate
+        return decision
+
+
+class DirectoryIndex:
+    """Recursive directory listing built on os.scandir with an incremental cache.
+
+    Each directory's entries are cached together with its mtime, a later
+    listing only rescans directories whose mtime changed, so repeated listings
+    of an unchanged tree cost one stat per directory.
+    """
+
+    ALWAYS_IGNORED = {".git", "__pycache__"}
+
+    def __init__(self):
+        self._dirs = {}
+        self._lock = threading.Lock()
+        self.scans = 0
+        self.reuses = 0
+
+    def _entries(self, directory):
+        """Returns (entries, ignore rules) for a directory, rescanning only if it changed."""
+        mtime = os.stat(directory).st_mtime_ns
+        gitignore = os.path.join(directory, ".gitignore")
+        try:
+            ignore_mtime = os.stat(gitignore).st_mtime_ns
+        except OSError:
+            ignore_mtime = None
+        with self._lock:
+            cached = self._dirs.get(directory)
+            if cached and cached[0] == mtime and cached[1] == ignore_mtime:
+                self.reuses += 1
+                return cached[2], cached[3]
+        with os.scandir(directory) as it:
+            entries = sorted(
+                (entry.name, entry.is_dir(follow_symlinks=False)) for entry in it
+            )
+        rules = IgnoreRules.load(directory) if ignore_mtime is not None else None
+        with self._lock:
+            self.scans += 1
+            self._dirs[directory] = (mtime, ignore_mtime, entries, rules)
+        return entries, rules
+
+    def walk(self, root, max_depth=2, pattern=None, ignore=(), include_ignored=False):
+        """Yields (relative path, is_dir) for entries under root, depth first."""
+        root = os.path.abspath(root)
+        yield from self._walk(root, root, 1, max_depth, pattern, ignore, include_ignored, [])
+
+    def _walk(self, root, directory, depth, max_depth, pattern, ignore, include_ignored, rules):
+        entries, own_rules = self._entries(directory)
+        if own_rules is not None:
+            rules = rules + [own_rules]
+        for name, is_dir in entries:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root)
+            if name in self.ALWAYS_IGNORED:
+                continue
+            if any(fnmatch.fnmatch(name, p) or fnmatch.fnmatch(relative, p) for p in ignore):
+                continue
+            if not include_ignored and self._ignored(rules, path, is_dir):
+                continue
+            if pattern is None or fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(relative, pattern):
+                yield relative, is_dir
+            if is_dir and (max_depth is None or depth < max_depth):
+                yield from self._walk(
+                    root, path, depth + 1, max_depth, pattern, ignore, include_ignored, rules
+                )
+
+    @staticmethod
+    def _ignored(rules, path, is_dir):
+        decision = False
+        for rule in rules:
+            result = rule.match(path, is_dir)
+            if result is not None:
+                decision = result
+        return decision
+
+    def stamp(self, root, max_depth=2):
+        """Returns the mtimes of the cached directories a walk of root would visit.
+
+        A directory's mtime changes when entries are added to or removed from
+        it, so an equal stamp means an earlier listing is still current.
+        """
+        root = os.path.abspath(root)
+        with self._lock:
+            directories = [
+                directory
+                for directory in self._dirs
+                if directory == root or directory.startswith(root + os.sep)
+            ]
+        stamp = []
+        for directory in sorted(directories):
+            depth = 0 if directory == root else os.path.relpath(directory, root).count(os.sep) + 1
+            if max_depth is not None and depth >= max_depth:
+                continue
+            try:
+                stamp.append((directory, os.stat(directory).st_mtime_ns))
+            except OSError:
+                stamp.append((directory, None))
+        return tuple(stamp)
+
+    def stats(self):
+        return {"scans": self.scans, "reuses": self.reuses, "directories": len(self._dirs)}
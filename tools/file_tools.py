@@ -1,6 +1,32 @@
+import json
+import mmap
 import os
-from langchain.tools import tool
+from typing import List, Literal, Optional
+from langchain_core.tools import tool
 from pydantic import BaseModel, validator, constr, ValidationError
+from datetime import datetime
+from tools.directory_index import DirectoryIndex
+from tools.memo import path_stamp, tool_memo
+from tools.tool_input import split_tool_input
+from tools.workspace import context_workspace, current_workspace, resolve
+
+# largest observation read_file returns without an explicit range
+READ_FILE_MAX_BYTES = int(os.environ.get("READ_FILE_MAX_BYTES", 32768))
+# entries per page returned by list_files
+LIST_FILES_PAGE_SIZE = int(os.environ.get("LIST_FILES_PAGE_SIZE", 100))
+
+# shared listing cache, refreshed by comparing directory mtimes
+directory_index = DirectoryIndex()
+
+# callables notified with the path of every file written through FileTools,
+# memoized tool results are dropped on every write
+write_listeners = [tool_memo.bump]
+
+
+def _notify_write(path):
+    """Tells listeners (e.g. the search index) that a file was written."""
+    for listener in write_listeners:
+        listener(path)
 
 
 class PathModel(BaseModel):
@@ -30,6 +56,147 @@ class WriteFileModel(BaseModel):
         return v
 
 
+class FileOperationModel(BaseModel):
+    op: Literal["create", "mkdir", "write", "append"]
+    path: constr(strip_whitespace=True, min_length=1)
+    content: str = ""
+
+
+# expect a JSON list of operations, or the list itself
+class BatchFileOperationsModel(BaseModel):
+    operations: List[FileOperationModel]
+
+    @classmethod
+    def from_input(cls, data):
+        if isinstance(data, str):
+            data = json.loads(data)
+        if isinstance(data, dict):
+            data = data.get("operations", [data])
+        return cls(operations=data)
+
+
+# expect a path with an optional range, e.g. 'app.log|lines=10-20',
+# 'app.log|bytes=0-4096', 'app.log|head=50', 'app.log|tail=50' or 'app.log|size'
+class ReadFileModel(BaseModel):
+    path: constr(strip_whitespace=True, min_length=1)
+    mode: Literal["full", "lines", "bytes", "head", "tail", "size"] = "full"
+    start: int = 0
+    end: Optional[int] = None
+
+    @classmethod
+    def from_input(cls, data):
+        path, options = split_tool_input(data)
+        for mode in ("lines", "bytes"):
+            if mode in options:
+                first, _, last = str(options[mode]).partition("-")
+                return cls(
+                    path=path,
+                    mode=mode,
+                    start=int(first or (1 if mode == "lines" else 0)),
+                    end=int(last) if last else None,
+                )
+        for mode in ("head", "tail"):
+            if mode in options:
+                count = options[mode]
+                return cls(path=path, mode=mode, end=10 if count is True else int(count))
+        if "size" in options:
+            return cls(path=path, mode="size")
+        return cls(path=path)
+
+
+# expect an optional directory with options, e.g. 'src|depth=3|glob=*.py|page=2|details',
+# 'ignore' takes comma separated patterns and 'depth=all' walks the whole tree
+class ListFilesModel(BaseModel):
+    path: constr(strip_whitespace=True, min_length=1) = "."
+    depth: Optional[int] = 2
+    glob: Optional[str] = None
+    ignore: list = []
+    page: int = 1
+    details: bool = False
+    all: bool = False
+
+    @classmethod
+    def from_input(cls, data):
+        path, options = split_tool_input(data or "")
+        depth = options.get("depth", 2)
+        return cls(
+            # agents used to pass a dummy argument to list the current directory
+            path="." if path.lower() in ("", "none", "null") else path,
+            depth=None if depth in ("all", "0") else int(depth),
+            glob=options.get("glob"),
+            ignore=[p.strip() for p in str(options.get("ignore", "")).split(",") if p.strip()],
+            page=int(options.get("page", 1)),
+            details=options.get("details", False),
+            all=options.get("all", False),
+        )
+
+
+def _map_file(f):
+    """Maps a file read-only, returns None for empty files which cannot be mapped."""
+    if os.fstat(f.fileno()).st_size == 0:
+        return None
+    return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def _line_offset(mapped, line, pos=0):
+    """Returns the byte offset where the given 1-based line starts, counted from pos."""
+    for _ in range(line - 1):
+        pos = mapped.find(b"\n", pos)
+        if pos == -1:
+            return len(mapped)
+        pos += 1
+    return pos
+
+
+def _read_slice(path, mode, start=0, end=None):
+    """Reads a byte range, line range, head or tail of a file through mmap."""
+    with open(path, "rb") as f:
+        mapped = _map_file(f)
+        if mapped is None:
+            return ""
+        with mapped:
+            if mode == "bytes":
+                data = mapped[start:end]
+            elif mode == "head":
+                data = mapped[: _line_offset(mapped, end + 1)]
+            elif mode == "tail":
+                pos = len(mapped) - 1 if mapped[-1:] == b"\n" else len(mapped)
+                for _ in range(end):
+                    pos = mapped.rfind(b"\n", 0, pos)
+                    if pos == -1:
+                        break
+                data = mapped[pos + 1 :]
+            else:
+                first = _line_offset(mapped, max(start, 1))
+                last = (
+                    _line_offset(mapped, end - max(start, 1) + 2, first)
+                    if end is not None
+                    else len(mapped)
+                )
+                data = mapped[first:last]
+    return data.decode("utf-8", errors="replace")
+
+
+def _file_size(path):
+    """Returns the size in bytes and number of lines of a file at constant memory."""
+    lines = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            lines += chunk.count(b"\n")
+    return os.path.getsize(path), lines
+
+
+def _listing_stamp(path="."):
+    try:
+        validated_input = ListFilesModel.from_input(path)
+    except (ValidationError, ValueError):
+        return None
+    if validated_input.details:
+        # sizes and times can change without a directory changing
+        return object()
+    return directory_index.stamp(resolve(validated_input.path), validated_input.depth)
+
+
 class FileTools:
 
     @tool
@@ -37,7 +204,7 @@ class FileTools:
     def get_current_directory(dummy_arg=None):
         """Returns the current working directory."""
         try:
-            current_dir = os.getcwd()
+            current_dir = current_workspace().cwd
             return f"Current directory: {current_dir}"
         except Exception as e:
             return f"Error getting current directory: {e}"
@@ -48,7 +215,8 @@ class FileTools:
         """Changes the current working directory to the given path."""
         try:
             validated_input = PathModel(path=path)
-            os.chdir(validated_input.path)
+            # only this context's workspace moves, never the shared default or the process cwd
+            context_workspace().chdir(validated_input.path)
             return f"Changed directory to {validated_input.path}."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -61,9 +229,7 @@ class FileTools:
         """Equivalent to the Unix 'touch' command. Creates an empty file if it does not exist, or updates its last modified time if it does."""
         try:
             validated_input = PathModel(path=path)
-            # Open the file in append mode and immediately close it to update last access and modification times without changing content
-            with open(validated_input.path, "a"):
-                pass
+            FileTools._touch(validated_input.path)
             return f"File '{validated_input.path}' touched successfully."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -76,7 +242,8 @@ class FileTools:
         """Creates a new directory at the specified path."""
         try:
             validated_input = PathModel(path=path)
-            os.makedirs(validated_input.path, exist_ok=True)
+            os.makedirs(resolve(validated_input.path), exist_ok=True)
+            tool_memo.bump()
             return f"Directory '{validated_input.path}' created successfully."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -85,34 +252,86 @@ class FileTools:
 
     @tool
     @staticmethod
+    @tool_memo.memoize(stamp=path_stamp)
     def check_if_file_exists(path):
         """Checks if a file or directory exists at the specified path."""
         try:
             validated_input = PathModel(path=path)
-            exists = os.path.exists(validated_input.path)
+            exists = os.path.exists(resolve(validated_input.path))
             return f"{'Exists' if exists else 'Does not exist'}: {validated_input.path}"
         except ValidationError as e:
             return f"Validation Error: {e}"
 
     @tool
     @staticmethod
-    def list_files(dummy_arg=None):
-        """Lists files in the current working directory."""
+    @tool_memo.memoize(stamp=_listing_stamp)
+    def list_files(path="."):
+        """Lists files under a directory (default: current directory), two levels deep, 100 entries per page. Append options to the path: '|depth=3' or '|depth=all', '|glob=*.py', '|ignore=build,*.log', '|page=2', '|details' for size and modified time, '|all' to include .gitignored files."""
         try:
-            files = os.listdir()
-            return f"Files in the current directory: {', '.join(files)}"
+            validated_input = ListFilesModel.from_input(path)
+            entries = list(
+                directory_index.walk(
+                    resolve(validated_input.path),
+                    max_depth=validated_input.depth,
+                    pattern=validated_input.glob,
+                    ignore=validated_input.ignore,
+                    include_ignored=validated_input.all,
+                )
+            )
+            if not entries:
+                return f"No files found in {validated_input.path}."
+            pages = (len(entries) + LIST_FILES_PAGE_SIZE - 1) // LIST_FILES_PAGE_SIZE
+            page = min(max(validated_input.page, 1), pages)
+            rows = []
+            for relative, is_dir in entries[
+                (page - 1) * LIST_FILES_PAGE_SIZE : page * LIST_FILES_PAGE_SIZE
+            ]:
+                name = relative + ("/" if is_dir else "")
+                if validated_input.details:
+                    stat = os.stat(os.path.join(resolve(validated_input.path), relative))
+                    modified = datetime.fromtimestamp(stat.st_mtime).strftime("%Y-%m-%d %H:%M")
+                    size = "-" if is_dir else stat.st_size
+                    name = f"{size:>10}  {modified}  {name}"
+                rows.append(name)
+            header = f"Files in {validated_input.path} (page {page}/{pages}, {len(entries)} entries):"
+            footer = (
+                f"\nMore entries available, append '|page={page + 1}' to see them."
+                if page < pages
+                else ""
+            )
+            return header + "\n" + "\n".join(rows) + footer
+        except ValidationError as e:
+            return f"Validation Error: {e}"
         except Exception as e:
             return f"Error listing files: {e}"
 
     @tool
     @staticmethod
+    @tool_memo.memoize(stamp=path_stamp)
     def read_file(path):
-        """Reads the content of a file at the given path."""
+        """Reads the content of a file at the given path. Large files are truncated, append '|lines=10-20', '|bytes=0-4096', '|head=50', '|tail=50' or '|size' to the path to read part of a file or get its size."""
         try:
-            validated_input = PathModel(path=path)
-            with open(validated_input.path, "r") as f:
-                content = f.read()
-            return content
+            validated_input = ReadFileModel.from_input(path)
+            if validated_input.mode == "size":
+                size, lines = _file_size(resolve(validated_input.path))
+                return f"{validated_input.path}: {size} bytes, {lines} lines."
+            if validated_input.mode != "full":
+                return _read_slice(
+                    resolve(validated_input.path),
+                    validated_input.mode,
+                    validated_input.start,
+                    validated_input.end,
+                )
+            full_path = resolve(validated_input.path)
+            size = os.path.getsize(full_path)
+            if size <= READ_FILE_MAX_BYTES:
+                with open(full_path, "r") as f:
+                    return f.read()
+            content = _read_slice(full_path, "bytes", 0, READ_FILE_MAX_BYTES)
+            return (
+                f"{content}\n[... truncated, {validated_input.path} is {size} bytes. "
+                "Append '|lines=a-b', '|bytes=a-b', '|head=n' or '|tail=n' to the path to read more.]"
+            )
         except ValidationError as e:
             return f"Validation Error: {e}"
         except Exception as e:
@@ -130,10 +349,7 @@ class FileTools:
             # Validate the input using AppendFileModel
             validated_data = AppendFileModel(filename=filename, data=data)
 
-            with open(validated_data.filename, "a") as f:
-                f.write(
-                    validated_data.data + "\n"
-                )  # Adding a newline for clarity in the appended content
+            FileTools._append(validated_data.filename, validated_data.data)
             return f"Appended content to {validated_data.filename}."
         except ValidationError as e:
             return f"Validation Error: {e.errors()}"
@@ -146,18 +362,82 @@ class FileTools:
         """Writes content to a file at the given path."""
         try:
             validated_data = WriteFileModel(data=data)
-            path, content = validated_data.data.split("|")
-            path = path.strip().replace("`", "")
-            if not path.startswith("./context"):
-                path = f"./context/{path}"
-            with open(path, "w") as f:
-                f.write(content)
+            path = FileTools._write(validated_data.data)
             return f"File written to {path}."
         except ValidationError as e:
             return f"Validation Error: {e.errors()}"
         except Exception as e:
             return f"Error writing file: {e}"
 
+    @tool
+    @staticmethod
+    def batch_file_operations(operations):
+        """Applies several file operations in one call. Takes a JSON list of objects with 'op' (one of 'create', 'mkdir', 'write', 'append'), 'path' and 'content', e.g. [{"op": "write", "path": "app.py", "content": "print(1)"}, {"op": "append", "path": "notes.md", "content": "done"}]. Returns the status of each operation."""
+        try:
+            validated_input = BatchFileOperationsModel.from_input(operations)
+        except ValidationError as e:
+            return f"Validation Error: {e.errors()}"
+        except ValueError as e:
+            return f"Error parsing operations: {e}"
+
+        results = []
+        for number, operation in enumerate(validated_input.operations, start=1):
+            try:
+                if operation.op == "create":
+                    path = FileTools._touch(PathModel(path=operation.path).path)
+                elif operation.op == "mkdir":
+                    path = PathModel(path=operation.path).path
+                    os.makedirs(resolve(path), exist_ok=True)
+                    tool_memo.bump()
+                elif operation.op == "append":
+                    validated_data = AppendFileModel(
+                        filename=operation.path, data=operation.content
+                    )
+                    path = FileTools._append(validated_data.filename, validated_data.data)
+                else:
+                    validated_data = WriteFileModel(
+                        data=f"{operation.path}|{operation.content}"
+                    )
+                    path = FileTools._write(validated_data.data)
+                results.append(f"{number}. {operation.op} {path}: ok")
+            except ValidationError as e:
+                results.append(f"{number}. {operation.op} {operation.path}: Validation Error: {e.errors()}")
+            except Exception as e:
+                results.append(f"{number}. {operation.op} {operation.path}: Error: {e}")
+
+        failed = sum(1 for result in results if not result.endswith(": ok"))
+        summary = f"Applied {len(results) - failed} of {len(results)} file operations."
+        return summary + "\n" + "\n".join(results)
+
+    @staticmethod
+    def _touch(path):
+        """Equivalent to 'touch', returns the path."""
+        # Open the file in append mode and immediately close it to update last access and modification times without changing content
+        with open(resolve(path), "a"):
+            pass
+        _notify_write(resolve(path))
+        return path
+
+    @staticmethod
+    def _append(filename, data):
+        """Appends a line of text to a file, returns the path."""
+        with open(resolve(filename), "a") as f:
+            f.write(data + "\n")  # Adding a newline for clarity in the appended content
+        _notify_write(resolve(filename))
+        return filename
+
+    @staticmethod
+    def _write(data):
+        """Writes 'path|content' data below ./context, returns the path written."""
+        path, content = data.split("|", 1)
+        path = path.strip().replace("`", "")
+        if not path.startswith("./context"):
+            path = f"./context/{path}"
+        with open(resolve(path), "w") as f:
+            f.write(content)
+        _notify_write(resolve(path))
+        return path
+
     # @tool
     # @staticmethod
     # def move_or_rename_file(source, destination):
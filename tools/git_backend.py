@@ -0,0 +1,189 @@
+import atexit
+import os
+import subprocess
+import threading
+import time
+from collections import defaultdict
+
+OBJECT_TYPES = ("blob", "tree", "commit", "tag")
+
+
+class GitBackend:
+    """Git runner for one repository.
+
+    Object reads go through long-lived `git cat-file --batch` and
+    `--batch-check` processes, everything else is an argv-list subprocess with
+    no shell. GIT_DIR and GIT_WORK_TREE are set from the cached repository
+    discovery, so git does not search for the repository on every call. Each
+    operation is timed.
+    """
+
+    _backends = {}
+    _toplevels = {}
+    _lock = threading.Lock()
+
+    def __init__(self, root, git_dir):
+        self.root = root
+        self.git_dir = git_dir
+        self.env = {**os.environ, "GIT_DIR": git_dir, "GIT_WORK_TREE": root}
+        self.timings = defaultdict(lambda: [0, 0.0])
+        self._batches = {}
+        self._batch_lock = threading.Lock()
+
+    @classmethod
+    def for_directory(cls, cwd):
+        """Returns the backend for the repository containing cwd, discovering it once."""
+        with cls._lock:
+            location = cls._toplevels.get(cwd)
+        if location is None:
+            result = subprocess.run(
+                ["git", "rev-parse", "--show-toplevel", "--absolute-git-dir"],
+                cwd=cwd,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            location = tuple(result.stdout.splitlines()[:2])
+            with cls._lock:
+                cls._toplevels[cwd] = location
+        with cls._lock:
+            backend = cls._backends.get(location)
+            if backend is None:
+                backend = cls(*location)
+                cls._backends[location] = backend
+            return backend
+
+    def _record(self, operation, started):
+        timing = self.timings[operation]
+        timing[0] += 1
+        timing[1] += time.perf_counter() - started
+
+    def run(self, args, cwd=None):
+        """Runs `git <args>` without a shell, raises CalledProcessError on failure."""
+        started = time.perf_counter()
+        try:
+            result = subprocess.run(
+                ["git", *args],
+                cwd=cwd or self.root,
+                env=self.env,
+                check=True,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+            )
+            return result.stdout
+        finally:
+            self._record(args[0], started)
+
+    def _batch(self, mode):
+        process = self._batches.get(mode)
+        if process is None or process.poll() is not None:
+            process = subprocess.Popen(
+                ["git", "cat-file", mode],
+                cwd=self.root,
+                env=self.env,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+            )
+            self._batches[mode] = process
+        return process
+
+    def _query(self, mode, spec, retry=True):
+        # one request per line, a newline would queue a second reply
+        if "\n" in spec or "\r" in spec:
+            raise ValueError(f"object name must be on one line: {spec!r}")
+        process = self._batch(mode)
+        try:
+            process.stdin.write(spec.encode() + b"\n")
+            process.stdin.flush()
+            header = process.stdout.readline().decode().rstrip("\n")
+        except (BrokenPipeError, ValueError):
+            header = ""
+        if header in (f"{spec} missing", f"{spec} ambiguous"):
+            return None, None
+        fields = header.split(" ")
+        if len(fields) != 3 or fields[1] not in OBJECT_TYPES or not fields[2].isdigit():
+            # the process died or is out of step with our requests, start it again
+            self._stop(mode)
+            if retry:
+                return self._query(mode, spec, retry=False)
+            return None, None
+        oid, object_type, size = fields
+        if mode == "--batch-check":
+            return (oid, object_type, int(size)), None
+        data = process.stdout.read(int(size))
+        process.stdout.read(1)  # trailing newline
+        return (oid, object_type, int(size)), data
+
+    def check(self, spec):
+        """Returns (oid, type, size) for an object name like 'HEAD:README.md', or None."""
+        started = time.perf_counter()
+        with self._batch_lock:
+            try:
+                return self._query("--batch-check", spec)[0]
+            finally:
+                self._record("cat-file --batch-check", started)
+
+    def cat_file(self, spec):
+        """Returns (oid, type, size, content bytes) for an object name, or None."""
+        started = time.perf_counter()
+        with self._batch_lock:
+            try:
+                info, data = self._query("--batch", spec)
+                return None if info is None else (*info, data)
+            finally:
+                self._record("cat-file --batch", started)
+
+    def _stop(self, mode):
+        process = self._batches.pop(mode, None)
+        if process is None:
+            return
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+        process.wait()
+        process.stdout.close()
+
+    def close(self):
+        with self._batch_lock:
+            for mode in list(self._batches):
+                self._stop(mode)
+
+    @classmethod
+    def close_all(cls):
+        """Stops the cat-file processes of every repository, registered with atexit."""
+        with cls._lock:
+            backends = list(cls._backends.values())
+        for backend in backends:
+            backend.close()
+
+    @classmethod
+    def stats(cls):
+        """Returns call counts and total seconds per git operation across repositories."""
+        totals = defaultdict(lambda: {"calls": 0, "seconds": 0.0})
+        with cls._lock:
+            backends = list(cls._backends.values())
+        for backend in backends:
+            for operation, (calls, seconds) in list(backend.timings.items()):
+                totals[operation]["calls"] += calls
+                totals[operation]["seconds"] += seconds
+        return dict(totals)
+
+    @classmethod
+    def print_stats(cls):
+        """Prints per-operation git timings at the end of a run."""
+        stats = cls.stats()
+        if not stats:
+            return
+        print("--------------------------------------------------")
+        print("Git operations:")
+        for operation, row in sorted(stats.items()):
+            average = row["seconds"] / row["calls"] * 1000
+            print(f"- {operation}: {row['calls']} calls, {row['seconds']:.2f}s total, {average:.1f}ms avg")
+        print("--------------------------------------------------")
+
+
+atexit.register(GitBackend.close_all)
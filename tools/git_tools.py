@@ -1,69 +1,351 @@
+import os
+import shlex
 import subprocess
-from langchain.tools import tool
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import Literal, Optional
+from tools.git_backend import GitBackend
+from tools.memo import file_stamp, tool_memo
+from tools.tool_input import split_tool_input
+from tools.workspace import current_workspace
+
+# default caps on the size of a single git observation
+GIT_MAX_ENTRIES = int(os.environ.get("GIT_MAX_ENTRIES", 50))
+GIT_MAX_DIFF_LINES = int(os.environ.get("GIT_MAX_DIFF_LINES", 200))
+
+# porcelain v2 XY status letters
+STATUS_NAMES = {
+    "M": "modified",
+    "T": "type changed",
+    "A": "added",
+    "D": "deleted",
+    "R": "renamed",
+    "C": "copied",
+    "U": "unmerged",
+}
+
+
+# expect an optional pathspec with options, e.g. 'src|offset=50'
+class GitStatusModel(BaseModel):
+    pathspec: Optional[str] = None
+    offset: int = Field(0, ge=0)
+    max: int = Field(GIT_MAX_ENTRIES, ge=1)
+
+    @classmethod
+    def from_input(cls, data):
+        pathspec, options = split_tool_input(data or "")
+        return cls(
+            pathspec=pathspec if pathspec.lower() not in ("", "none", "null") else None,
+            offset=options.get("offset", 0),
+            max=options.get("max", GIT_MAX_ENTRIES),
+        )
+
+
+# expect an optional pathspec with options, e.g. 'src/app.py|mode=patch|staged|rev=HEAD~1|offset=200'
+class GitDiffModel(BaseModel):
+    pathspec: Optional[str] = None
+    mode: Literal["stat", "numstat", "patch"] = "stat"
+    staged: bool = False
+    rev: Optional[str] = None
+    offset: int = Field(0, ge=0)
+    max: int = Field(GIT_MAX_DIFF_LINES, ge=1)
+
+    @validator("rev")
+    def validate_rev(cls, v):
+        # a rev is passed to git as it is, '--output=...' would be an option
+        if v is not None and str(v).startswith("-"):
+            raise ValueError("rev must be a commit, not an option")
+        return v
+
+    @classmethod
+    def from_input(cls, data):
+        pathspec, options = split_tool_input(data or "")
+        return cls(
+            pathspec=pathspec if pathspec.lower() not in ("", "none", "null") else None,
+            mode=options.get("mode", "stat"),
+            staged=options.get("staged", False),
+            rev=options.get("rev"),
+            offset=options.get("offset", 0),
+            max=options.get("max", GIT_MAX_DIFF_LINES),
+        )
+
+
+# expect options, e.g. 'n=10|skip=10|path=src|oneline'
+class GitLogModel(BaseModel):
+    n: int = Field(20, ge=1)
+    skip: int = Field(0, ge=0)
+    path: Optional[str] = None
+    oneline: bool = False
+
+    @classmethod
+    def from_input(cls, data):
+        # every part is an option, a bare number is taken as 'n'
+        _, options = split_tool_input("|" + str(data or ""))
+        for key in [key for key in options if key.lstrip("-").isdigit()]:
+            del options[key]
+            options.setdefault("n", key)
+        return cls(
+            n=options.get("n", 20),
+            skip=options.get("skip", 0),
+            path=options.get("path"),
+            oneline=options.get("oneline", False),
+        )
+
+
+def _pathspec(pathspec):
+    return ["--", pathspec] if pathspec else []
+
+
+def _page(lines, offset, limit, more_hint):
+    """Returns one page of lines plus a continuation hint when more are available."""
+    page = lines[offset : offset + limit]
+    if offset + limit < len(lines):
+        page.append(
+            f"[{len(lines) - offset - limit} more available, call again with '{more_hint}={offset + limit}']"
+        )
+    return page
+
+
+# tracked files per repository, listed again when the index changes
+_tracked = {}
+
+
+def _repository_stamp(pathspec=None):
+    """The index, HEAD, every tracked file and the directories holding them.
+
+    Staging, commits, edits to tracked files and new files next to them all
+    change the stamp, and a few hundred stats cost less than running git.
+    """
+    try:
+        backend = GitBackend.for_directory(current_workspace().cwd)
+        index = file_stamp(os.path.join(backend.git_dir, "index"))
+        cached = _tracked.get(backend.git_dir)
+        if cached is None or cached[0] != index:
+            files = [
+                os.path.join(backend.root, path)
+                for path in backend.run(["ls-files", "-z"]).split("\0")
+                if path
+            ]
+            directories = sorted({os.path.dirname(path) for path in files} | {backend.root})
+            cached = (index, files + directories)
+            _tracked[backend.git_dir] = cached
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return (
+        index,
+        file_stamp(os.path.join(backend.git_dir, "HEAD")),
+        tuple(file_stamp(path) for path in cached[1]),
+    )
 
 
 class GitTools:
 
     @tool
     @staticmethod
-    def git_status():
-        """Displays the working tree status."""
-        return GitTools.run_git_command("git status")
+    @tool_memo.memoize(stamp=_repository_stamp)
+    def git_status(pathspec=None):
+        """Summarizes the working tree status: branch, staged, unstaged, untracked and conflicted files. Optionally takes a pathspec, append '|offset=50' to see more entries."""
+        try:
+            validated_input = GitStatusModel.from_input(pathspec)
+            output = GitTools._run(
+                ["status", "--porcelain=v2", "--branch", "--untracked-files=normal"]
+                + _pathspec(validated_input.pathspec)
+            )
+        except ValidationError as e:
+            return f"Validation Error: {e}"
+        except ValueError as e:
+            return f"Error reading options: {e}"
+        except subprocess.CalledProcessError as e:
+            return f"Error executing command: {e.stderr}"
+
+        branch, upstream = "(unknown)", ""
+        entries = []
+        for line in output.splitlines():
+            if line.startswith("# branch.head "):
+                branch = line[len("# branch.head ") :]
+            elif line.startswith("# branch.ab "):
+                ahead, behind = line[len("# branch.ab ") :].split()
+                upstream = f" (ahead {ahead.lstrip('+')}, behind {behind.lstrip('-')})"
+            elif line.startswith(("1 ", "2 ")):
+                fields = line.split(" ", 8 if line[0] == "1" else 9)
+                xy, path = fields[1], fields[-1].split("\t")[0]
+                if xy[0] != ".":
+                    entries.append(f"staged {STATUS_NAMES.get(xy[0], xy[0])}: {path}")
+                if xy[1] != ".":
+                    entries.append(f"unstaged {STATUS_NAMES.get(xy[1], xy[1])}: {path}")
+            elif line.startswith("u "):
+                entries.append(f"conflicted: {line.split(' ', 10)[-1]}")
+            elif line.startswith("? "):
+                entries.append(f"untracked: {line[2:]}")
+
+        header = f"On branch {branch}{upstream}, {len(entries)} changes."
+        if not entries:
+            return header + " Working tree clean."
+        return "\n".join(
+            [header]
+            + _page(entries, validated_input.offset, validated_input.max, "offset")
+        )
 
     @tool
     @staticmethod
     def git_branch():
         """Lists all branches."""
-        return GitTools.run_git_command("git branch")
+        return GitTools.run_git_command(["branch"])
 
     @tool
     @staticmethod
     def git_commit(message):
         """Stages all changes and creates a commit with the given message."""
-        GitTools.run_git_command("git add -A")
-        return GitTools.run_git_command(f'git commit -m "{message}"')
+        GitTools.run_git_command(["add", "-A"])
+        try:
+            return GitTools.run_git_command(["commit", "-m", message])
+        finally:
+            tool_memo.bump()
 
     @tool
     @staticmethod
-    def git_diff():
-        """Shows changes between commits, commit and working tree, etc."""
-        return GitTools.run_git_command("git diff")
+    def git_diff(pathspec=None):
+        """Summarizes changes in the working tree as a per-file stat. Optionally takes a pathspec and options: '|mode=patch' for the patch or '|mode=numstat', '|staged' for staged changes, '|rev=HEAD~1' to compare with a commit, '|offset=200' to continue a long patch."""
+        try:
+            validated_input = GitDiffModel.from_input(pathspec)
+            command = ["diff"]
+            if validated_input.staged:
+                command.append("--cached")
+            if validated_input.mode != "patch":
+                command.append("--numstat")
+            if validated_input.rev:
+                command += ["--end-of-options", validated_input.rev]
+            output = GitTools._run(command + _pathspec(validated_input.pathspec))
+        except ValidationError as e:
+            return f"Validation Error: {e}"
+        except ValueError as e:
+            return f"Error reading options: {e}"
+        except subprocess.CalledProcessError as e:
+            return f"Error executing command: {e.stderr}"
+
+        lines = output.splitlines()
+        if not lines:
+            return "No changes."
+        if validated_input.mode == "patch":
+            return "\n".join(
+                _page(lines, validated_input.offset, validated_input.max, "offset")
+            )
+
+        rows, added, deleted = [], 0, 0
+        for line in lines:
+            insertions, deletions, path = line.split("\t", 2)
+            if insertions != "-":
+                added += int(insertions)
+                deleted += int(deletions)
+            if validated_input.mode == "numstat":
+                rows.append(line)
+            else:
+                change = "binary" if insertions == "-" else f"+{insertions} -{deletions}"
+                rows.append(f"{path} | {change}")
+        header = f"{len(lines)} files changed, {added} insertions(+), {deleted} deletions(-)."
+        return "\n".join(
+            [header] + _page(rows, validated_input.offset, validated_input.max, "offset")
+        )
 
     @tool
     @staticmethod
-    def git_log(n=0, oneline=False):
-        """Shows the commit logs. 'n' limits the number of entries. 'oneline' shows a brief summary."""
-        command = "git log"
-        if n > 0:
-            command += f" -n {n}"
-        if oneline:
-            command += " --oneline"
-        return GitTools.run_git_command(command)
+    def git_log(options=""):
+        """Shows the latest commits (20 by default) as 'hash date author subject'. Takes options: 'n=10', 'skip=20' to page further back, 'path=src' to limit to a path, 'oneline' for hash and subject only."""
+        try:
+            validated_input = GitLogModel.from_input(options)
+            log_format = "%h %s" if validated_input.oneline else "%h %ad %an: %s"
+            output = GitTools._run(
+                [
+                    "log",
+                    "--date=short",
+                    f"--format={log_format}",
+                    "-n",
+                    str(validated_input.n + 1),
+                    "--skip",
+                    str(validated_input.skip),
+                ]
+                + _pathspec(validated_input.path)
+            )
+        except ValidationError as e:
+            return f"Validation Error: {e}"
+        except ValueError as e:
+            return f"Error reading options: {e}"
+        except subprocess.CalledProcessError as e:
+            return f"Error executing command: {e.stderr}"
+
+        commits = output.splitlines()
+        if not commits:
+            return "No commits found."
+        if len(commits) > validated_input.n:
+            commits = commits[: validated_input.n]
+            commits.append(
+                f"[more available, call again with 'skip={validated_input.skip + validated_input.n}']"
+            )
+        return "\n".join(commits)
 
     @tool
     @staticmethod
     def git_push():
         """Updates remote refs along with associated objects."""
-        return GitTools.run_git_command("git push")
+        return GitTools.run_git_command(["push"])
 
     @tool
     @staticmethod
     def git_pull():
         """Fetches from and integrates with another repository or a local branch."""
-        return GitTools.run_git_command("git pull")
+        try:
+            return GitTools.run_git_command(["pull"])
+        finally:
+            tool_memo.bump()
+
+    @tool
+    @staticmethod
+    def git_show_file(spec):
+        """Shows a file as it is stored in git, e.g. 'HEAD:README.md' or 'HEAD~2:src/app.py'. Append '|offset=200' to continue a long file."""
+        try:
+            name, options = split_tool_input(spec)
+            if "\n" in name or "\r" in name:
+                return f"Invalid object name {name!r}, pass one 'rev:path' on a single line."
+            offset = int(options.get("offset", 0))
+            backend = GitBackend.for_directory(current_workspace().cwd)
+            rev, separator, path = name.partition(":")
+            if separator and path.startswith(("./", "../")):
+                # like the CLI, './' paths are relative to the current directory
+                path = os.path.relpath(
+                    os.path.join(current_workspace().cwd, path), backend.root
+                )
+                name = f"{rev}:{path}"
+            info = backend.check(name)
+            found = backend.cat_file(name) if info and info[1] == "blob" else None
+        except subprocess.CalledProcessError as e:
+            return f"Error executing command: {e.stderr}"
+        except ValueError as e:
+            return f"Error reading options: {e}"
+        if info is None:
+            return f"No object found for '{name}'."
+        if found is None:
+            return f"'{name}' is a {info[1]}, not a file."
+        _, _, size, data = found
+        if b"\0" in data[:8192]:
+            return f"'{name}' is a binary file of {size} bytes."
+        lines = data.decode("utf-8", errors="replace").splitlines()
+        return "\n".join(_page(lines, offset, GIT_MAX_DIFF_LINES, "offset"))
 
     @staticmethod
     def run_git_command(command):
         """Utility method to run a git command and return its output or error."""
         try:
-            result = subprocess.run(
-                command,
-                shell=True,
-                check=True,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-            )
-            return result.stdout or "Command executed successfully."
+            return GitTools._run(command) or "Command executed successfully."
         except subprocess.CalledProcessError as e:
             return f"Error executing command: {e.stderr}"
+
+    @staticmethod
+    def _run(args):
+        """Runs git with an argv list in the current workspace, raises CalledProcessError on failure."""
+        if isinstance(args, str):
+            # legacy command strings are split like a shell would, never run through one
+            args = shlex.split(args)
+            if args and args[0] == "git":
+                args = args[1:]
+        cwd = current_workspace().cwd
+        return GitBackend.for_directory(cwd).run(args, cwd=cwd)
@@ -0,0 +1,36 @@
+import threading
+import time
+from inspect import signature
+from typing import Any, Callable
+from langchain_core.tools import BaseTool
+
+
+class LazyTool(BaseTool):
+    """A single-input tool that builds the tool it stands for on its first call.
+
+    Keeps network-backed tools, and the packages they import, out of startup.
+    A tool that cannot be built returns the error, like the other tools, and
+    is tried again on the next call.
+    """
+
+    factory: Callable
+    tool: Any = None
+    build_seconds: float = 0.0
+    _lock = threading.Lock()
+
+    def _build(self):
+        with self._lock:
+            if self.tool is None:
+                started = time.perf_counter()
+                self.tool = self.factory()
+                self.build_seconds = time.perf_counter() - started
+            return self.tool
+
+    def _run(self, query, run_manager=None):
+        try:
+            tool = self._build()
+        except Exception as e:
+            return f"Error starting {self.name}: {e}"
+        if signature(tool._run).parameters.get("run_manager"):
+            return tool._run(query, run_manager=run_manager)
+        return tool._run(query)
@@ -0,0 +1,137 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from tools.tool_input import split_tool_input
+from tools.workspace import current_workspace, resolve
+
+# read-only tool results are reused until a tool writes, the stamp of what
+# they read changes or they are TOOL_MEMO_TTL seconds old, TOOL_MEMO=0 disables
+TOOL_MEMO = os.environ.get("TOOL_MEMO", "1") == "1"
+TOOL_MEMO_TTL = float(os.environ.get("TOOL_MEMO_TTL", 30))
+TOOL_MEMO_SIZE = int(os.environ.get("TOOL_MEMO_SIZE", 256))
+
+
+def file_stamp(path):
+    """Returns the modification time and size of a path, None if it is missing."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def path_stamp(tool_input=None):
+    """Stamp for tools whose input is a 'path|options' string, e.g. read_file."""
+    path, _ = split_tool_input(tool_input or ".")
+    return file_stamp(resolve(path or "."))
+
+
+class ToolMemo:
+    """Memoizes read-only tool calls within a workspace generation.
+
+    A result is keyed on the tool, its arguments, the workspace directory and
+    the generation counter. Every mutating tool bumps the counter, so nothing
+    read before a write is reused after it. Each memoized tool can also give
+    a stamp, e.g. the mtime of the file it read, which is compared on every
+    hit to catch edits made outside the tools. TOOL_MEMO_TTL bounds how long
+    a result is kept for changes a stamp cannot see, such as a file edited
+    two directories below a listing.
+    """
+
+    def __init__(self, enabled=TOOL_MEMO, ttl=TOOL_MEMO_TTL, size=TOOL_MEMO_SIZE):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.size = size
+        self.generation = 0
+        self._entries = OrderedDict()
+        self._hits = defaultdict(int)
+        self._misses = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def bump(self, path=None):
+        """Invalidates every memoized result, called by the mutating tools."""
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def memoize(self, stamp=None):
+        """Decorates a read-only tool function, stamp(*args) returns the state it reads."""
+
+        def decorate(func):
+            name = func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                key = (
+                    name,
+                    repr(args),
+                    repr(sorted(kwargs.items())),
+                    current_workspace().cwd,
+                    self.generation,
+                )
+                current = stamp(*args, **kwargs) if stamp else None
+                now = time.monotonic()
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry[0] == current and now - entry[1] < self.ttl:
+                        self._entries.move_to_end(key)
+                        self._hits[name] += 1
+                        return entry[2]
+                    self._misses[name] += 1
+                result = func(*args, **kwargs)
+                with self._lock:
+                    # a write during the call bumped the generation, the key is stale
+                    if key[-1] == self.generation:
+                        self._entries[key] = (current, now, result)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.size:
+                            self._entries.popitem(last=False)
+                return result
+
+            return wrapper
+
+        return decorate
+
+    def stats(self):
+        """Returns hits, misses and hit ratio per tool."""
+        with self._lock:
+            names = sorted(set(self._hits) | set(self._misses))
+            stats = {}
+            for name in names:
+                hits, misses = self._hits[name], self._misses[name]
+                stats[name] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_ratio": hits / (hits + misses) if hits + misses else 0.0,
+                }
+            return stats
+
+    def reset(self):
+        with self._lock:
+            self.generation = 0
+            self._entries.clear()
+            self._hits.clear()
+            self._misses.clear()
+
+
+# shared by every tool module
+tool_memo = ToolMemo()
+
+
+def print_memo_stats():
+    """Prints the memoized tool hit rates at the end of a run."""
+    stats = tool_memo.stats()
+    if not stats:
+        return
+    print("--------------------------------------------------")
+    print("Tool Memo:")
+    for name, counts in stats.items():
+        print(f"- {name}: hits {counts['hits']}, misses {counts['misses']}, hit ratio {counts['hit_ratio']:.0%}")
+    hits = sum(counts["hits"] for counts in stats.values())
+    calls = hits + sum(counts["misses"] for counts in stats.values())
+    print(f"Tool calls answered from memo: {hits}/{calls}, generation {tool_memo.generation}")
+    print("--------------------------------------------------")
@@ -0,0 +1,170 @@
+import hashlib
+import os
+import re
+import threading
+from collections import OrderedDict
+from inspect import signature
+from typing import Any
+from langchain_core.tools import BaseTool, tool
+from tools.tool_input import split_tool_input
+
+# observations above OBSERVATION_MAX_TOKENS are stored under a handle and the
+# agent gets the first page, OBSERVATION_GUARD=0 passes every output through
+OBSERVATION_GUARD = os.environ.get("OBSERVATION_GUARD", "1") == "1"
+OBSERVATION_MAX_TOKENS = int(os.environ.get("OBSERVATION_MAX_TOKENS", 1500))
+OBSERVATION_PAGE_TOKENS = int(os.environ.get("OBSERVATION_PAGE_TOKENS", 1000))
+OBSERVATION_STORE_SIZE = int(os.environ.get("OBSERVATION_STORE_SIZE", 64))
+
+FETCH_TOOL_NAME = "fetch_observation_page"
+
+
+def _tokens(text):
+    # the same rough count the usage tracker falls back to
+    return len(text) // 4
+
+
+def _pages(text, page_chars):
+    """Splits text into pages of about page_chars, on line boundaries where possible."""
+    pages, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        while len(line) > page_chars:
+            if current:
+                pages.append("".join(current))
+                current, size = [], 0
+            pages.append(line[:page_chars])
+            line = line[page_chars:]
+        if size + len(line) > page_chars and current:
+            pages.append("".join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line)
+    if current:
+        pages.append("".join(current))
+    return pages or [""]
+
+
+class ObservationStore:
+    """Oversized tool outputs kept out of the prompt, by handle.
+
+    The agent sees the first page and the handle, later pages are fetched
+    with fetch_observation_page only if the agent needs them, so one large
+    observation is not resent with every later step of the task. The same
+    output from the same tool gets the same handle.
+    """
+
+    def __init__(self, size=OBSERVATION_STORE_SIZE):
+        self.size = size
+        self._pages = OrderedDict()
+        self._lock = threading.Lock()
+
+    def spill(self, tool_name, output, max_tokens=None, page_tokens=None):
+        """Returns the output as it is, or its first page and a handle when it is over the limit."""
+        text = output if isinstance(output, str) else str(output)
+        max_tokens = OBSERVATION_MAX_TOKENS if max_tokens is None else max_tokens
+        if _tokens(text) <= max_tokens:
+            return output
+        page_tokens = OBSERVATION_PAGE_TOKENS if page_tokens is None else page_tokens
+        pages = _pages(text, page_tokens * 4)
+        handle = "obs-" + hashlib.sha1(f"{tool_name}\0{text}".encode()).hexdigest()[:8]
+        with self._lock:
+            self._pages[handle] = (tool_name, pages, text.count("\n") + 1)
+            self._pages.move_to_end(handle)
+            while len(self._pages) > self.size:
+                self._pages.popitem(last=False)
+        return (
+            f"{pages[0]}\n[{tool_name} returned about {_tokens(text)} tokens "
+            f"({text.count(chr(10)) + 1} lines), stored as {handle}. This is page 1 of {len(pages)}, "
+            f"call {FETCH_TOOL_NAME} with '{handle}|page=2' for the next page "
+            f"or '{handle}|find=text' to search it.]"
+        )
+
+    def page(self, handle, number):
+        """Returns (tool name, page text, page count), None if the handle is unknown."""
+        with self._lock:
+            entry = self._pages.get(handle)
+            if entry is None:
+                return None
+            self._pages.move_to_end(handle)
+        tool_name, pages, _ = entry
+        number = min(max(number, 1), len(pages))
+        return tool_name, pages[number - 1], len(pages)
+
+    def find(self, handle, text, limit=50):
+        """Returns the numbered lines containing the text, None if the handle is unknown."""
+        with self._lock:
+            entry = self._pages.get(handle)
+        if entry is None:
+            return None
+        lines = "".join(entry[1]).splitlines()
+        needle = text.lower()
+        return [f"{number}: {line}" for number, line in enumerate(lines, start=1) if needle in line.lower()][:limit]
+
+
+# shared by every guarded tool
+observation_store = ObservationStore()
+
+
+class GuardedTool(BaseTool):
+    """Runs a tool and spills its output to the observation store when it is too large.
+
+    Wraps any langchain tool without changing it: the wrapper takes the tool's
+    name, description and input parsing and calls its `_run` directly, so the
+    call is reported to callbacks once.
+    """
+
+    tool: Any
+
+    @classmethod
+    def wrap(cls, tool):
+        if not OBSERVATION_GUARD or isinstance(tool, cls) or tool.name == FETCH_TOOL_NAME:
+            return tool
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            handle_tool_error=tool.handle_tool_error,
+            tool=tool,
+        )
+
+    @property
+    def args(self):
+        return self.tool.args
+
+    def _parse_input(self, tool_input):
+        return self.tool._parse_input(tool_input)
+
+    def _to_args_and_kwargs(self, tool_input):
+        return self.tool._to_args_and_kwargs(tool_input)
+
+    def _run(self, *args, run_manager=None, **kwargs):
+        if signature(self.tool._run).parameters.get("run_manager"):
+            kwargs["run_manager"] = run_manager
+        return observation_store.spill(self.name, self.tool._run(*args, **kwargs))
+
+
+class ObservationTools:
+    @tool
+    @staticmethod
+    def fetch_observation_page(handle):
+        """Fetches more of a large tool output that was stored under a handle, e.g. 'obs-1a2b3c4d|page=2', or searches it with 'obs-1a2b3c4d|find=error'."""
+        name, options = split_tool_input(handle)
+        name = re.sub(r"[^\w-]", "", name)
+        if "find" in options and options["find"] is not True:
+            lines = observation_store.find(name, str(options["find"]))
+            if lines is None:
+                return f"No stored observation {name}, it may have expired. Run the tool again."
+            if not lines:
+                return f"No lines in {name} contain '{options['find']}'."
+            return "\n".join(lines)
+        try:
+            number = int(options.get("page", 1))
+        except ValueError:
+            return f"Error reading options: page must be a number, got '{options['page']}'"
+        found = observation_store.page(name, number)
+        if found is None:
+            return f"No stored observation {name}, it may have expired. Run the tool again."
+        tool_name, text, pages = found
+        number = min(max(number, 1), pages)
+        more = f", call again with '{name}|page={number + 1}' for the next page" if number < pages else ""
+        return f"{text}\n[{tool_name} output {name}, page {number} of {pages}{more}.]"
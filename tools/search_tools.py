@@ -0,0 +1,216 @@
+import fnmatch
+import os
+import re
+import threading
+from langchain_core.tools import tool
+from pydantic import BaseModel, constr, ValidationError
+from typing import Optional
+from tools.file_tools import directory_index, write_listeners
+from tools.tool_input import split_tool_input
+from tools.workspace import current_workspace
+
+# files larger than this are not indexed
+SEARCH_MAX_FILE_BYTES = int(os.environ.get("SEARCH_MAX_FILE_BYTES", 1024 * 1024))
+SNIPPET_CHARS = 160
+
+
+# expect a query with options, e.g. 'TaskRepository|glob=*.py|max=20',
+# 'def \w+_agent|regex' or 'readme|case' for a case-sensitive match
+class SearchModel(BaseModel):
+    query: constr(min_length=1)
+    regex: bool = False
+    case: bool = False
+    glob: Optional[str] = None
+    path: str = "."
+    max: int = 50
+
+    @classmethod
+    def from_input(cls, data):
+        if isinstance(data, dict):
+            query, options = split_tool_input(data)
+        else:
+            # only trailing '|key=value' parts with a known key are options,
+            # the rest is the query as it is, so 'foo|bar|regex' searches 'foo|bar'
+            parts = str(data).split("|")
+            options = {}
+            while len(parts) > 1:
+                key, sep, value = parts[-1].partition("=")
+                key = key.strip().lower()
+                if key not in cls.model_fields or key == "query":
+                    break
+                options[key] = value.strip() if sep else True
+                parts.pop()
+            query = "|".join(parts)
+        return cls(
+            query=query,
+            regex=options.get("regex", False),
+            case=options.get("case", False),
+            glob=options.get("glob"),
+            path=options.get("path", "."),
+            max=int(options.get("max", 50)),
+        )
+
+
+def _trigrams(text):
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    """Inverted trigram index over the text files under a root directory.
+
+    Substring queries intersect the posting sets of the query's trigrams to
+    find candidate files before scanning their lines. The index is refreshed
+    incrementally: only files whose size or mtime changed, or that were
+    written through FileTools, are re-read.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._files = {}
+        self._postings = {}
+        self._dirty = set()
+        # guards the index, _dirty_lock only the dirty set so a write never
+        # waits for a refresh
+        self._lock = threading.RLock()
+        self._dirty_lock = threading.Lock()
+
+    def invalidate(self, path):
+        """Marks a file as changed, it is re-read on the next query."""
+        with self._dirty_lock:
+            self._dirty.add(path)
+
+    def refresh(self):
+        """Re-indexes new, changed and written files and drops removed ones."""
+        # taken before the walk, a file written during it is re-read next time
+        with self._dirty_lock:
+            dirty, self._dirty = self._dirty, set()
+        seen = set()
+        with self._lock:
+            for relative, is_dir in directory_index.walk(self.root, max_depth=None):
+                if is_dir:
+                    continue
+                path = os.path.join(self.root, relative)
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                signature = (stat.st_mtime_ns, stat.st_size)
+                entry = self._files.get(path)
+                if entry and entry[0] == signature and path not in dirty:
+                    continue
+                self._index(path, signature)
+            for path in set(self._files) - seen:
+                self._drop(path)
+
+    def _index(self, path, signature):
+        self._drop(path)
+        lines = None
+        if signature[1] <= SEARCH_MAX_FILE_BYTES:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                if b"\0" not in data[:8192]:
+                    lines = data.decode("utf-8", errors="replace").splitlines()
+            except OSError:
+                pass
+        self._files[path] = (signature, lines)
+        if lines:
+            for trigram in _trigrams("\n".join(lines).lower()):
+                self._postings.setdefault(trigram, set()).add(path)
+
+    def _drop(self, path):
+        entry = self._files.pop(path, None)
+        if entry and entry[1]:
+            for trigram in _trigrams("\n".join(entry[1]).lower()):
+                postings = self._postings.get(trigram)
+                if postings is not None:
+                    postings.discard(path)
+                    if not postings:
+                        del self._postings[trigram]
+
+    def _candidates(self, query):
+        trigrams = _trigrams(query.lower())
+        if not trigrams:
+            return [path for path, entry in self._files.items() if entry[1]]
+        postings = sorted((self._postings.get(t, set()) for t in trigrams), key=len)
+        return set.intersection(*postings) if postings[0] else set()
+
+    def search(self, query, regex=False, case=False, glob=None, path=".", limit=50):
+        """Returns (relative path, line number, snippet) hits, and whether more exist."""
+        flags = 0 if case else re.IGNORECASE
+        pattern = re.compile(query if regex else re.escape(query), flags)
+        with self._lock:
+            self.refresh()
+            return self._search(pattern, query, regex, glob, path, limit)
+
+    def _search(self, pattern, query, regex, glob, path, limit):
+        candidates = (
+            [p for p, entry in self._files.items() if entry[1]]
+            if regex
+            else self._candidates(query)
+        )
+        scope = os.path.normpath(os.path.join(self.root, path))
+        hits = []
+        for file_path in sorted(candidates):
+            relative = os.path.relpath(file_path, self.root)
+            if not (file_path == scope or file_path.startswith(scope + os.sep)):
+                continue
+            if glob and not (
+                fnmatch.fnmatch(os.path.basename(relative), glob)
+                or fnmatch.fnmatch(relative, glob)
+            ):
+                continue
+            for number, line in enumerate(self._files[file_path][1], start=1):
+                match = pattern.search(line)
+                if match is None:
+                    continue
+                if len(hits) == limit:
+                    return hits, True
+                start = max(match.start() - SNIPPET_CHARS // 2, 0)
+                hits.append((relative, number, line[start : start + SNIPPET_CHARS].strip()))
+        return hits, False
+
+
+class SearchTools:
+    _indexes = {}
+
+    @staticmethod
+    def index_for(root):
+        """Returns the search index for a root directory, creating it on first use."""
+        root = os.path.abspath(root)
+        index = SearchTools._indexes.get(root)
+        if index is None:
+            index = SearchIndex(root)
+            SearchTools._indexes[root] = index
+            write_listeners.append(index.invalidate)
+        return index
+
+    @tool
+    @staticmethod
+    def search_files(query):
+        """Searches the text of every file under the current directory and returns file:line hits with snippets. Append options to the query: '|regex' for a regular expression, '|case' for a case-sensitive match, '|glob=*.py', '|path=src', '|max=20'."""
+        try:
+            validated_input = SearchModel.from_input(query)
+            hits, more = SearchTools.index_for(current_workspace().cwd).search(
+                validated_input.query,
+                regex=validated_input.regex,
+                case=validated_input.case,
+                glob=validated_input.glob,
+                path=validated_input.path,
+                limit=validated_input.max,
+            )
+            if not hits:
+                return f"No matches for '{validated_input.query}'."
+            lines = [f"{path}:{number}: {snippet}" for path, number, snippet in hits]
+            if more:
+                lines.append(
+                    f"More matches available, narrow the search or append '|max={validated_input.max * 2}'."
+                )
+            return "\n".join(lines)
+        except ValidationError as e:
+            return f"Validation Error: {e}"
+        except re.error as e:
+            return f"Invalid regular expression: {e}"
+        except Exception as e:
+            return f"Error searching files: {e}"
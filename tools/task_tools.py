@@ -1,8 +1,10 @@
 import hashlib
 import os
-from crewai import Task
-from langchain.tools import tool
+from langchain_core.tools import tool
 from pydantic import BaseModel, validator, ValidationError
+from context_compactor import ContextCompactor
+from task_ledger import AmbiguousTaskId, TaskLedger
+from tools.memo import file_stamp, tool_memo
 
 
 # Model for adding a task
@@ -54,10 +56,21 @@ class TaskStatuses:
         ]
 
 
+def _task_store_stamp(role=None):
+    from agents_v2 import TaskRepository
+
+    return TaskRepository.store.version
+
+
+def _context_stamp(dummy_arg=None):
+    return file_stamp(TaskManagerTools.CONTEXT_FILE_PATH)
+
+
 # TODO: revisit docstring like get_current_tasks for all functions
 class TaskRepositoryTools:
     @tool
     @staticmethod
+    @tool_memo.memoize(stamp=_task_store_stamp)
     def get_current_tasks(role=None):
         """
         Retrieves the current tasks for a specified role or all roles if no role is specified.
@@ -72,6 +85,9 @@ class TaskRepositoryTools:
 
         try:
             if role:
+                role = str(role).strip().lower()
+                if role not in TaskRepository.store.roles():
+                    return f"Unknown role {role}, expected one of {', '.join(TaskRepository.store.roles())}."
                 # Retrieve tasks for a specific role using the existing class method
                 tasks = TaskRepository.get_tasks_for_role(role)
                 if tasks:  # Check if any tasks were found for the role
@@ -102,9 +118,9 @@ class TaskRepositoryTools:
         """Clears all tasks from the shared task lists using the task roles iterator."""
         from agents_v2 import TaskRepository
 
-        # Iterate over all task roles and clear their respective task lists
-        for _, tasks in TaskRepository.iterate_task_roles():
-            tasks.clear()  # Clear the tasks list for each role
+        # Drop the pending tasks of every role in one pass over the store
+        TaskRepository.clear_all_tasks()
+        tool_memo.bump()
 
         return "All tasks cleared."
 
@@ -112,6 +128,7 @@ class TaskRepositoryTools:
     @staticmethod
     def add_task_for_planner(description):
         """Adds a task with the provided description for the planner."""
+        from crewai import Task
         from agents_v2 import PlanningCrew, TaskRepository
 
         try:
@@ -120,7 +137,10 @@ class TaskRepositoryTools:
                 description=validated_input.description,
                 agent=PlanningCrew.planner_agent(),
             )
-            TaskRepository.planner_tasks.append(new_task)
+            record, created = TaskRepository.add_task("planner", new_task)
+            if not created:
+                return f"Task {record.id} ({record.status}) already covers this for the planner: {record.description}"
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the planner."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -129,6 +149,7 @@ class TaskRepositoryTools:
     @staticmethod
     def add_task_for_executor(description):
         """Adds a task with the provided description for the executor."""
+        from crewai import Task
         from agents_v2 import ExecutionCrew, TaskRepository
 
         try:
@@ -137,7 +158,10 @@ class TaskRepositoryTools:
                 description=validated_input.description,
                 agent=ExecutionCrew.executor_agent(),
             )
-            TaskRepository.executor_tasks.append(new_task)
+            record, created = TaskRepository.add_task("executor", new_task)
+            if not created:
+                return f"Task {record.id} ({record.status}) already covers this for the executor: {record.description}"
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the executor."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -146,6 +170,7 @@ class TaskRepositoryTools:
     @staticmethod
     def add_task_for_reviewer(description):
         """Adds a task with the provided description for the reviewer."""
+        from crewai import Task
         from agents_v2 import ExecutionCrew, TaskRepository
 
         try:
@@ -154,7 +179,10 @@ class TaskRepositoryTools:
                 description=validated_input.description,
                 agent=ExecutionCrew.reviewer_agent(),
             )
-            TaskRepository.reviewer_tasks.append(new_task)
+            record, created = TaskRepository.add_task("reviewer", new_task)
+            if not created:
+                return f"Task {record.id} ({record.status}) already covers this for the reviewer: {record.description}"
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the reviewer."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -163,6 +191,7 @@ class TaskRepositoryTools:
     @staticmethod
     def add_task_for_decider(description):
         """Adds a task with the provided description for the decider."""
+        from crewai import Task
         from agents_v2 import ExecutionCrew, TaskRepository
 
         try:
@@ -171,7 +200,10 @@ class TaskRepositoryTools:
                 description=validated_input.description,
                 agent=ExecutionCrew.decider_agent(),
             )
-            TaskRepository.shared_executor_tasks.append(new_task)
+            record, created = TaskRepository.add_task("decider", new_task)
+            if not created:
+                return f"Task {record.id} ({record.status}) already covers this for the decider: {record.description}"
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the decider."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -182,6 +214,7 @@ class CrewTaskTools:
     @staticmethod
     def add_task_for_planner(description):
         """Adds a task with the provided description for the planner."""
+        from crewai import Task
         from agents import CoordinationCrew
 
         try:
@@ -190,7 +223,10 @@ class CrewTaskTools:
                 description=validated_input.description,
                 agent=CoordinationCrew.planner_agent(),
             )
-            CoordinationCrew.add_dynamic_task(new_task)
+            task_id, created = CoordinationCrew.add_dynamic_task(new_task)
+            if not created:
+                return f"Task {task_id} already covers this for the planner."
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the planner."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -199,6 +235,7 @@ class CrewTaskTools:
     @staticmethod
     def add_task_for_executor(description):
         """Adds a task with the provided description for the executor."""
+        from crewai import Task
         from agents import CoordinationCrew
 
         try:
@@ -207,7 +244,10 @@ class CrewTaskTools:
                 description=validated_input.description,
                 agent=CoordinationCrew.executor_agent(),
             )
-            CoordinationCrew.add_dynamic_task(new_task)
+            task_id, created = CoordinationCrew.add_dynamic_task(new_task)
+            if not created:
+                return f"Task {task_id} already covers this for the executor."
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the executor."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -216,6 +256,7 @@ class CrewTaskTools:
     @staticmethod
     def add_task_for_reviewer(description):
         """Adds a task with the provided description for the reviewer."""
+        from crewai import Task
         from agents import CoordinationCrew
 
         try:
@@ -224,7 +265,10 @@ class CrewTaskTools:
                 description=validated_input.description,
                 agent=CoordinationCrew.reviewer_agent(),
             )
-            CoordinationCrew.add_dynamic_task(new_task)
+            task_id, created = CoordinationCrew.add_dynamic_task(new_task)
+            if not created:
+                return f"Task {task_id} already covers this for the reviewer."
+            tool_memo.bump()
             return f"Task '{validated_input.description}' added for the reviewer."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -233,49 +277,44 @@ class CrewTaskTools:
 class TaskManagerTools:
     CONTEXT_FILE_PATH = "./context.md"
     TASK_FILE_PATH = "./tasks.md"
+    TASK_DB_PATH = os.environ.get("TASK_DB_PATH", "./tasks.db")
+    _ledgers = {}
 
     @tool
     @staticmethod
+    @tool_memo.memoize(stamp=_context_stamp)
     def read_context(dummy_arg=None):
         """Reads the context from the markdown file and returns it as a string."""
         if not os.path.exists(TaskManagerTools.CONTEXT_FILE_PATH):
             return "Context file does not exist."
 
-        with open(TaskManagerTools.CONTEXT_FILE_PATH, "r") as file:
-            return file.read()
+        # older results are summarized once the file exceeds the token budget
+        return ContextCompactor.for_path(TaskManagerTools.CONTEXT_FILE_PATH).read()
 
     @tool
     @staticmethod
-    def read_tasks(dummy_arg=None):
-        """Reads tasks from the markdown file and returns them as a list of dictionaries."""
-        tasks = []
-        if not os.path.exists(TaskManagerTools.TASK_FILE_PATH):
-            return "Task file does not exist."
-
-        with open(TaskManagerTools.TASK_FILE_PATH, "r") as file:
-            for line in file:
-                if line.startswith("- ["):
-                    status, _, task_content = line.strip().partition("] ")
-                    task_id, _, description = task_content.partition(": ")
-                    tasks.append(
-                        {
-                            "id": task_id,
-                            "status": status[2:-1],
-                            "description": description,
-                        }
-                    )
-
-        return tasks
+    def read_tasks(status=None):
+        """Reads tasks from the task ledger and returns them as a list of dictionaries. Pass a status (TODO, ACTIVE, REVIEW, DONE) to only return tasks with that status."""
+        if status is not None and str(status).strip().upper() in (
+            TaskStatuses.STATUS_DESCRIPTIONS
+        ):
+            return TaskManagerTools._ledger().read(str(status).strip().upper())
+        return TaskManagerTools._ledger().read()
 
     @tool
     @staticmethod
     def add_task(description):
-        """Adds a new task with the given description to the markdown file."""
+        """Adds a new task with the given description to the task ledger."""
         try:
             validated_input = AddTaskModel(description=description)
             task_id = TaskManagerTools._generate_task_id(validated_input.description)
-            with open(TaskManagerTools.TASK_FILE_PATH, "a") as file:
-                file.write(f"- [TODO] {task_id}: {validated_input.description}\n")
+            created = TaskManagerTools._ledger().add(
+                task_id, validated_input.description, TaskStatuses.TODO
+            )
+            if not created:
+                return f"Task {task_id} already exists."
+            tool_memo.bump()
+            TaskManagerTools._export_if_enabled()
             return f"Task {task_id} added."
         except ValidationError as e:
             return f"Validation Error: {e}"
@@ -288,21 +327,44 @@ class TaskManagerTools:
             validated_input = UpdateTaskStatusModel(
                 task_id=task_id, new_status=new_status
             )
-            tasks_updated = []
-            with open(TaskManagerTools.TASK_FILE_PATH, "r") as file:
-                tasks = file.readlines()
-
-            with open(TaskManagerTools.TASK_FILE_PATH, "w") as file:
-                for line in tasks:
-                    if f"{validated_input.task_id}:" in line:
-                        parts = line.split(": ", 1)
-                        line = f"{parts[0].split(' ', 1)[0]} [{validated_input.new_status.upper()}]: {parts[1]}"
-                    tasks_updated.append(line)
-
-                file.writelines(tasks_updated)
-            return f"Task {validated_input.task_id} status updated to {validated_input.new_status.upper()}."
+            full_id = TaskManagerTools._ledger().update_status(
+                validated_input.task_id.strip(), validated_input.new_status
+            )
+            if full_id is None:
+                return f"Task {validated_input.task_id} not found."
+            tool_memo.bump()
+            TaskManagerTools._export_if_enabled()
+            return f"Task {full_id} status updated to {validated_input.new_status}."
         except ValidationError as e:
             return f"Validation Error: {e}"
+        except AmbiguousTaskId as e:
+            return f"Error updating task: {e}"
+
+    @tool
+    @staticmethod
+    def export_tasks(dummy_arg=None):
+        """Exports the task ledger to the markdown task file."""
+        path = TaskManagerTools._ledger().export_markdown(
+            TaskManagerTools.TASK_FILE_PATH
+        )
+        return f"Tasks exported to {path}."
+
+    @staticmethod
+    def _ledger():
+        """Returns the task ledger, importing a legacy tasks.md on first use."""
+        ledger = TaskManagerTools._ledgers.get(TaskManagerTools.TASK_DB_PATH)
+        if ledger is None:
+            ledger = TaskLedger(TaskManagerTools.TASK_DB_PATH)
+            if ledger.count() == 0:
+                ledger.import_markdown(TaskManagerTools.TASK_FILE_PATH)
+            TaskManagerTools._ledgers[TaskManagerTools.TASK_DB_PATH] = ledger
+        return ledger
+
+    @staticmethod
+    def _export_if_enabled():
+        """Mirrors the ledger to tasks.md after each write when TASK_LEDGER_EXPORT=1."""
+        if os.environ.get("TASK_LEDGER_EXPORT", "0") == "1":
+            TaskManagerTools._ledger().export_markdown(TaskManagerTools.TASK_FILE_PATH)
 
     @staticmethod
     def _generate_task_id(description):
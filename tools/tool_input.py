@@ -0,0 +1,17 @@
+def split_tool_input(data):
+    """Splits a 'value|key=value|flag' tool input into the value and an options dict.
+
+    Agents pass a single string to tools, so optional arguments ride along after
+    a '|' separator, e.g. 'notes.log|tail=50'. Flags without '=' map to True.
+    """
+    if isinstance(data, dict):
+        data = dict(data)
+        return str(data.pop("path", data.pop("value", ""))), data
+    value, *parts = str(data).split("|")
+    options = {}
+    for part in parts:
+        key, sep, option = part.partition("=")
+        key = key.strip().lower()
+        if key:
+            options[key] = option.strip() if sep else True
+    return value.strip().strip("`"), options
@@ -0,0 +1,15 @@
+from tools.observation_guard import OBSERVATION_GUARD, GuardedTool, ObservationTools
+
+
+def toolset(*tools):
+    """Returns the tools de-duplicated, guarded and sorted by name.
+
+    Agents list their tools through this so the tool section of every prompt
+    is rendered in the same order, whatever order the tools were declared in.
+    Each tool's oversized outputs are spilled to the observation store, and
+    fetch_observation_page is added to read them.
+    """
+    if OBSERVATION_GUARD and tools:
+        tools = (*tools, ObservationTools.fetch_observation_page)
+    unique = {tool.name: GuardedTool.wrap(tool) for tool in tools}
+    return [unique[name] for name in sorted(unique)]
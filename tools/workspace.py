@@ -0,0 +1,80 @@
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+
+class Workspace:
+    """Working directory that FileTools and GitTools resolve paths against.
+
+    Replaces the process-global os.chdir: each agent, task or thread can run
+    inside its own workspace, so concurrent crews in one process do not change
+    each other's view of the filesystem. A workspace without an explicit
+    directory follows the process working directory until it is changed.
+    """
+
+    def __init__(self, cwd=None):
+        self._cwd = os.path.abspath(cwd) if cwd else None
+
+    @property
+    def cwd(self):
+        return self._cwd or os.getcwd()
+
+    def resolve(self, path):
+        """Returns the absolute path for a path relative to this workspace."""
+        return os.path.normpath(os.path.join(self.cwd, os.path.expanduser(str(path))))
+
+    def chdir(self, path):
+        """Changes this workspace's directory, leaving the process cwd untouched."""
+        target = self.resolve(path)
+        if not os.path.isdir(target):
+            raise NotADirectoryError(f"Not a directory: {path}")
+        self._cwd = target
+        return target
+
+    @contextmanager
+    def activate(self):
+        """Makes this the workspace for tool calls made inside the block."""
+        token = _current_workspace.set(self)
+        try:
+            yield self
+        finally:
+            _current_workspace.reset(token)
+
+    def run(self, func, *args, **kwargs):
+        """Calls func inside this workspace in a copy of the current context, e.g. on a worker thread."""
+
+        def call():
+            with self.activate():
+                return func(*args, **kwargs)
+
+        return copy_context().run(call)
+
+    def __repr__(self):
+        return f"Workspace({self.cwd!r})"
+
+
+_default_workspace = Workspace()
+_current_workspace = ContextVar("workspace", default=None)
+
+
+def current_workspace():
+    """Returns the workspace active in this context, or the process default."""
+    return _current_workspace.get() or _default_workspace
+
+
+def context_workspace():
+    """Returns the workspace active in this context, starting one at the current directory if there is none.
+
+    The process default is shared by every context, whatever changes its
+    directory must go through this instead.
+    """
+    workspace = _current_workspace.get()
+    if workspace is None:
+        workspace = Workspace(_default_workspace.cwd)
+        _current_workspace.set(workspace)
+    return workspace
+
+
+def resolve(path):
+    """Resolves a tool path against the current workspace."""
+    return current_workspace().resolve(path)